@@ -0,0 +1,76 @@
+"""
+Bytes written per conversation turn: inline context_used copies versus
+content-addressed context digests.
+
+Replays a synthetic conversation the way main.on_message builds it (the last
+`--history` turns are sent as context) and counts the payload bytes each
+scheme stores for every turn. Run from the repository root:
+
+    python -m benchmarks.context_storage --turns 50 --reply-chars 4000
+"""
+import argparse
+import random
+import string
+
+from cogs.botDBMS import context_digest
+
+DIGEST_BYTES = 32
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(string.ascii_letters + " ") for _ in range(length))
+
+
+def simulate(turns, history, message_chars, reply_chars, seed=0):
+    rng = random.Random(seed)
+    conversation = []
+    stored_digests = set()
+    results = []
+    for turn in range(1, turns + 1):
+        message = random_text(rng, message_chars)
+        reply = random_text(rng, reply_chars)
+        context = []
+        for msg, resp in conversation[-history:]:
+            context.extend([msg, resp])
+
+        row_bytes = len(message.encode()) + len(reply.encode())
+        inline = row_bytes + sum(len(c.encode()) for c in context)
+
+        new_contexts = 0
+        for content in context:
+            digest = context_digest(content)
+            if digest not in stored_digests:
+                stored_digests.add(digest)
+                new_contexts += DIGEST_BYTES + len(content.encode())
+        addressed = row_bytes + DIGEST_BYTES * len(context) + new_contexts
+
+        results.append((turn, inline, addressed))
+        conversation.append((message, reply))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--history", type=int, default=5, help="turns replayed as context")
+    parser.add_argument("--message-chars", type=int, default=200)
+    parser.add_argument("--reply-chars", type=int, default=4000)
+    args = parser.parse_args()
+
+    results = simulate(args.turns, args.history, args.message_chars, args.reply_chars)
+
+    print(f"{'turn':>6} {'inline bytes':>14} {'digest bytes':>14}")
+    for turn, inline, addressed in results:
+        if turn in (1, 2, 5, 10) or turn % 25 == 0 or turn == args.turns:
+            print(f"{turn:>6} {inline:>14,} {addressed:>14,}")
+
+    total_inline = sum(r[1] for r in results)
+    total_addressed = sum(r[2] for r in results)
+    print()
+    print(f"average per turn: inline {total_inline / len(results):,.0f} B, "
+          f"digests {total_addressed / len(results):,.0f} B "
+          f"({total_inline / total_addressed:.1f}x less written)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import commands, tasks
+from cogs.botDBMS import get_async_database
+
+NO_COMMAND = -1
+
+class ActivityBuffer:
+    """
+    Column-oriented buffer of activity events.
+    User ids, timestamps and interned command ids live in typed arrays, so a
+    pending event costs a few machine words instead of a tuple of objects.
+    """
+    def __init__(self):
+        self.user_ids = array('q')
+        self.timestamps = array('d')
+        self.command_ids = array('i')
+        self._command_names: List[str] = []
+        self._command_index: Dict[str, int] = {}
+
+    def add(self, user_id: int, command: Optional[str], timestamp: float):
+        if command is None:
+            command_id = NO_COMMAND
+        else:
+            command_id = self._command_index.get(command)
+            if command_id is None:
+                command_id = len(self._command_names)
+                self._command_names.append(command)
+                self._command_index[command] = command_id
+        self.user_ids.append(user_id)
+        self.timestamps.append(timestamp)
+        self.command_ids.append(command_id)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def drain(self) -> List[Tuple[int, Optional[str], datetime]]:
+        """Return buffered events as (user_id, command, timestamp) rows and reset"""
+        names = self._command_names
+        rows = [
+            (user_id, names[command_id] if command_id != NO_COMMAND else None, datetime.fromtimestamp(ts))
+            for user_id, ts, command_id in zip(self.user_ids, self.timestamps, self.command_ids)
+        ]
+        self.__init__()
+        return rows
+
+class ActivityTracker(commands.Cog):
+    """Records commands and (throttled) chat messages into user_activities"""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.db = get_async_database()
+        self.buffer = ActivityBuffer()
+        self.batch_size = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+        self.max_buffer = int(os.getenv("ACTIVITY_MAX_BUFFER", "50000"))
+        self.message_interval = float(os.getenv("ACTIVITY_MESSAGE_INTERVAL_SECONDS", "60"))
+        self._last_message_at: Dict[int, float] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        # After a failed write only the periodic loop retries, not every new event
+        self._flush_failed = False
+        self.flush_activity.start()
+
+    async def cog_unload(self):
+        self.flush_activity.cancel()
+        await self.flush()
+
+    def record(self, user_id: int, command: Optional[str] = None):
+        self.buffer.add(user_id, command, time.time())
+        if len(self.buffer) >= self.batch_size and not self._flush_failed and (
+                self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        self.record(ctx.author.id, ctx.command.qualified_name)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or message.content.startswith('!'):
+            return
+        # At most one chat event per user per interval; commands are always recorded
+        now = time.monotonic()
+        last = self._last_message_at.get(message.author.id)
+        if last is not None and now - last < self.message_interval:
+            return
+        self._last_message_at[message.author.id] = now
+        self.record(message.author.id)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not len(self.buffer):
+                return 0
+            rows = self.buffer.drain()
+            try:
+                await self.db.record_activities(rows)
+            except Exception as e:
+                print(f"Error recording activity: {e}")
+                self._flush_failed = True
+                self._requeue(rows)
+                return 0
+            self._flush_failed = False
+            return len(rows)
+
+    def _requeue(self, rows: List[Tuple[int, Optional[str], datetime]]):
+        # Failed rows go back ahead of anything recorded meanwhile, dropping the oldest if we overflow
+        rows += self.buffer.drain()
+        overflow = len(rows) - self.max_buffer
+        if overflow > 0:
+            del rows[:overflow]
+            print(f"Dropped {overflow} buffered activity events")
+        for user_id, command, timestamp in rows:
+            self.buffer.add(user_id, command, timestamp.timestamp())
+
+    @tasks.loop(seconds=30.0)
+    async def flush_activity(self):
+        await self.flush()
+        cutoff = time.monotonic() - self.message_interval
+        self._last_message_at = {
+            user_id: seen for user_id, seen in self._last_message_at.items() if seen >= cutoff
+        }
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ActivityTracker(bot))
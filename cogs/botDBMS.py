@@ -1,66 +1,139 @@
 import discord
 from discord.ext import commands
 import psycopg2
-from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+from collections import Counter, OrderedDict, deque
+from datetime import date, datetime, timedelta
 import json
-from typing import List, Dict, Any
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 import os
 from dotenv import load_dotenv
+from cogs.categorizer import ContentCategorizer
+from cogs.dbpool import ConnectionPool, is_connection_lost
+from cogs.dbmetrics import CountingCursor, QueryMetrics
+from cogs.circuitbreaker import CircuitBreaker
+from cogs.historycache import ConversationCache
+from cogs.migrations import run_migrations
+from cogs.pagination import KeysetPaginator
+from cogs.partitions import MONTHS_AHEAD, add_months, drop_partitions_before, ensure_partitions, month_start
+
+def context_digest(content: str) -> str:
+    """md5 hex digest of a context text; identical to Postgres md5(content)"""
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+def content_scope(guild_id: Optional[int], user_id: int) -> tuple:
+    """
+    WHERE condition limiting categorized content to what the caller may see:
+    everything from their guild, or only their own direct-message entries
+    """
+    if guild_id is not None:
+        return "guild_id = %s", (guild_id,)
+    return "guild_id IS NULL AND user_id = %s", (user_id,)
 
 class BotDatabase:
-    def __init__(self):
+    def __init__(self, pool: ConnectionPool = None):
         load_dotenv()
         self.connection_params = {
             "dbname": os.getenv("POSTGRES_DB", "Encourage Bot"),
             "user": os.getenv("POSTGRES_USER"),
             "password": os.getenv("POSTGRES_PASS"),
             "host": os.getenv("POSTGRES_HOST", "localhost"),
-            "port": os.getenv("POSTGRES_PORT", "5432")
+            "port": os.getenv("POSTGRES_PORT", "5432"),
+            "connect_timeout": int(os.getenv("POSTGRES_CONNECT_TIMEOUT", "5")),
+            "cursor_factory": CountingCursor
         }
+        self.pool = pool or ConnectionPool(
+            self.connection_params,
+            minconn=int(os.getenv("POSTGRES_POOL_MIN", "1")),
+            maxconn=int(os.getenv("POSTGRES_POOL_MAX", "10")),
+            health_check_interval=float(os.getenv("POSTGRES_POOL_HEALTH_CHECK_SECONDS", "30"))
+        )
+        self.breaker = CircuitBreaker(
+            self._probe,
+            failure_threshold=int(os.getenv("DB_CIRCUIT_FAILURE_THRESHOLD", "3")),
+            probe_interval=float(os.getenv("DB_CIRCUIT_PROBE_SECONDS", "10"))
+        )
+        self.metrics = QueryMetrics()
+        self.categorizer = ContentCategorizer.from_env()
+        # user_id -> newest-first contexts, least recently used users dropped first
+        self._context_memory: "OrderedDict[int, deque]" = OrderedDict()
+        self._context_memory_lock = threading.Lock()
+        self._context_memory_users = int(os.getenv("CONTEXT_MEMORY_CACHE_USERS", "10000"))
+        self.history_cache = ConversationCache(
+            turns_per_key=int(os.getenv("HISTORY_CACHE_TURNS", "20")),
+            max_bytes=int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        )
+        # 0 keeps conversation history forever
+        self.retention_months = int(os.getenv("CONVERSATION_RETENTION_MONTHS", "0"))
+        # Recent-turn reads only look this far back, so they touch the newest partitions; 0 reads everything
+        lookback_days = float(os.getenv("CONVERSATION_LOOKBACK_DAYS", "0"))
+        self.history_lookback = timedelta(days=lookback_days) if lookback_days > 0 else None
     
+    @contextmanager
     def get_connection(self):
-        try:
-            return psycopg2.connect(**self.connection_params)
-        except psycopg2.Error as e:
-            print(f"Database connection error: {e}")
-            raise
-        
-    def release_connection(self, connection):
         """
-        Close the database connection
-        
-        :param connection: Database connection to close
+        Borrow a pooled connection for a `with` block.
+        The transaction is committed when the block exits cleanly and the
+        connection goes back to the pool either way. Lost or refused
+        connections feed the circuit breaker; while it is open this raises DatabaseUnavailable
+        immediately instead of waiting on a connect timeout.
         """
+        self.breaker.check()
         try:
-            if connection:
-                connection.close()
+            with self.pool.connection() as conn:
+                yield conn
         except psycopg2.Error as e:
-            print(f"Error closing connection: {e}")
+            # Deadlocks, lock and statement timeouts etc. are the query's problem, not the server's
+            if is_connection_lost(e):
+                self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    def _probe(self):
+        # Bypasses the breaker; run by its background thread while the circuit is open
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+
+    def ping(self) -> bool:
+        """Run a trivial query to confirm the database answers"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                return cur.fetchone()[0] == 1
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Current connection pool usage"""
+        return self.pool.stats()
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
+
+    def _insert_values(self, cur, statement: str, rows: list, fetch: bool = False, page_size: int = 100):
+        """Multi-row INSERT of `rows` into the `VALUES %s` of `statement`"""
+        return execute_values(cur, statement, rows, page_size=page_size, fetch=fetch)
 
     def track_user_activity_patterns(self, user_id: int) -> Dict[str, Any]:
         """
         Analyzes user's activity patterns and returns insights about their behavior
         Returns peak activity hours, most used commands, and activity trends
+        Reads the per-user rollups, so the cost does not grow with history length.
         """
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Create table if it doesn't exist
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS user_activities (
-                        id SERIAL PRIMARY KEY,
-                        user_id BIGINT,
-                        command TEXT,
-                        timestamp TIMESTAMP
-                    )
-                """)
-                
                 # Get peak activity hours
                 cur.execute("""
-                    SELECT EXTRACT(HOUR FROM timestamp) as hour,
-                           COUNT(*) as activity_count
-                    FROM user_activities
+                    SELECT hour, activity_count
+                    FROM user_activity_hourly
                     WHERE user_id = %s
-                    GROUP BY hour
                     ORDER BY activity_count DESC
                     LIMIT 3
                 """, (user_id,))
@@ -68,10 +141,9 @@ class BotDatabase:
                 
                 # Get most used commands
                 cur.execute("""
-                    SELECT command, COUNT(*) as usage_count
-                    FROM user_activities
+                    SELECT command, usage_count
+                    FROM user_command_counts
                     WHERE user_id = %s
-                    GROUP BY command
                     ORDER BY usage_count DESC
                     LIMIT 5
                 """, (user_id,))
@@ -82,95 +154,142 @@ class BotDatabase:
                     "popular_commands": [{"command": cmd, "count": count} for cmd, count in popular_commands]
                 }
 
+    def record_activities(self, rows: list) -> None:
+        """
+        Bulk insert activity events and fold them into the hourly and
+        per-command rollups in the same transaction
+        :param rows: (user_id, command, timestamp) tuples; command is None for chat messages
+        """
+        if not rows:
+            return
+        hourly = Counter((user_id, timestamp.hour) for user_id, _, timestamp in rows)
+        command_counts = Counter((user_id, command) for user_id, command, _ in rows if command is not None)
+
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                self._insert_values(cur, """
+                    INSERT INTO user_activities (user_id, command, timestamp)
+                    VALUES %s
+                """, rows)
+                # Keys are pre-aggregated and sorted so concurrent flushes lock rows in the same order
+                self._insert_values(cur, """
+                    INSERT INTO user_activity_hourly (user_id, hour, activity_count)
+                    VALUES %s
+                    ON CONFLICT (user_id, hour)
+                    DO UPDATE SET activity_count = user_activity_hourly.activity_count + EXCLUDED.activity_count
+                """, [(user_id, hour, count) for (user_id, hour), count in sorted(hourly.items())])
+                if command_counts:
+                    self._insert_values(cur, """
+                        INSERT INTO user_command_counts (user_id, command, usage_count)
+                        VALUES %s
+                        ON CONFLICT (user_id, command)
+                        DO UPDATE SET usage_count = user_command_counts.usage_count + EXCLUDED.usage_count
+                    """, [(user_id, command, count) for (user_id, command), count in sorted(command_counts.items())])
+
     def implement_context_memory(self, user_id: int, context: str, max_memory: int = 10) -> List[str]:
         """
         Implements a conversation memory system that remembers previous contexts
-        and allows for more natural conversations
+        and allows for more natural conversations.
+        Each user owns `max_memory` slots written round-robin by a single upsert,
+        so nothing is ever deleted. max_memory must stay the same between calls.
+        Returns the newest contexts first, served from memory after the first call.
         """
+        with self._context_memory_lock:
+            memories = self._context_memory.get(user_id)
+            cached = memories is not None and memories.maxlen == max_memory
+
+        loaded = None
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Create table if it doesn't exist
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS conversation_memory (
-                        id SERIAL PRIMARY KEY,
-                        user_id BIGINT,
-                        context TEXT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Store new context
-                cur.execute("""
-                    INSERT INTO conversation_memory (user_id, context)
-                    VALUES (%s, %s)
-                """, (user_id, context))
-                
-                # Retrieve conversation history BEFORE cleaning up
-                cur.execute("""
-                    SELECT context FROM conversation_memory
-                    WHERE user_id = %s
-                    ORDER BY timestamp DESC
-                    LIMIT %s
-                """, (user_id, max_memory))
-                
-                memory_list = [row[0] for row in cur.fetchall()]
-                
-                # Clean up old entries
-                cur.execute("""
-                    DELETE FROM conversation_memory
-                    WHERE id NOT IN (
-                        SELECT id FROM conversation_memory
-                        WHERE user_id = %s
-                        ORDER BY timestamp DESC
-                        LIMIT %s
-                    )
-                    AND user_id = %s
-                """, (user_id, max_memory, user_id))
-                
-                conn.commit()
-                return memory_list
+                self._push_context_memory(cur, user_id, context, max_memory)
+                if not cached:
+                    # First call for this user since startup: read the ring once
+                    loaded = self._read_context_memory(cur, user_id, max_memory)
 
-    def create_dynamic_user_rankings(self) -> List[Dict[str, Any]]:
+        # The transaction has committed, so the cache never holds a context the database lacks
+        with self._context_memory_lock:
+            memories = self._context_memory.get(user_id)
+            if loaded is None and memories is not None and memories.maxlen == max_memory:
+                memories.appendleft(context)
+                self._context_memory.move_to_end(user_id)
+                return list(memories)
+        if loaded is None:
+            # Evicted while the write was running; read the ring back
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    loaded = self._read_context_memory(cur, user_id, max_memory)
+
+        with self._context_memory_lock:
+            self._context_memory[user_id] = loaded
+            self._context_memory.move_to_end(user_id)
+            while len(self._context_memory) > self._context_memory_users:
+                self._context_memory.popitem(last=False)
+        return list(loaded)
+
+    def _read_context_memory(self, cur, user_id: int, max_memory: int) -> deque:
+        cur.execute("""
+            SELECT context FROM conversation_memory
+            WHERE user_id = %s
+            ORDER BY timestamp DESC
+            LIMIT %s
+        """, (user_id, max_memory))
+        return deque((row[0] for row in cur.fetchall()), maxlen=max_memory)
+
+    def _push_context_memory(self, cur, user_id: int, context: str, max_memory: int):
+        # Advance the user's sequence and overwrite the slot it lands on in one statement
+        cur.execute("""
+            WITH next AS (
+                INSERT INTO context_memory_seq (user_id, seq)
+                VALUES (%s, 0)
+                ON CONFLICT (user_id) DO UPDATE SET seq = context_memory_seq.seq + 1
+                RETURNING seq
+            )
+            INSERT INTO conversation_memory (user_id, slot, context, timestamp)
+            SELECT %s, next.seq %% %s, %s, CURRENT_TIMESTAMP FROM next
+            ON CONFLICT (user_id, slot)
+            DO UPDATE SET context = EXCLUDED.context, timestamp = EXCLUDED.timestamp
+        """, (user_id, user_id, max_memory, context))
+
+    def create_dynamic_user_rankings(self, limit: int = 10, after: tuple = None) -> List[Dict[str, Any]]:
         """
         Creates a dynamic ranking system based on user participation,
-        helpfulness, and activity metrics
+        helpfulness, and activity metrics.
+        The weighted score is a stored column kept current by Postgres whenever
+        points change, so a page is read straight off idx_user_points_score.
+        :param after: (total_score, user_id, rank) of the last entry of the previous page
         """
+        if after is None:
+            condition, params, rank = "", (limit,), 0
+        else:
+            # Scores descend and ties ascend by user_id, so the two halves of the key go opposite ways
+            condition = "WHERE total_score <= %s AND (total_score < %s OR user_id > %s)"
+            params, rank = (after[0], after[0], after[1], limit), after[2]
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Create necessary tables if they don't exist
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS user_points (
-                        user_id BIGINT PRIMARY KEY,
-                        activity_points INTEGER DEFAULT 0,
-                        helpful_reactions INTEGER DEFAULT 0,
-                        streak_days INTEGER DEFAULT 0,
-                        last_active DATE
-                    )
-                """)
-                
-                # Calculate rankings with weighted scores
-                cur.execute("""
+                cur.execute(f"""
                     SELECT 
                         user_id,
                         activity_points,
                         helpful_reactions,
                         streak_days,
-                        (activity_points * 0.4 + helpful_reactions * 0.4 + streak_days * 0.2) as total_score
+                        total_score
                     FROM user_points
-                    ORDER BY total_score DESC
-                    LIMIT 10
-                """)
+                    {condition}
+                    ORDER BY total_score DESC, user_id
+                    LIMIT %s
+                """, params)
                 
                 rankings = cur.fetchall()
                 return [
                     {
+                        "rank": rank + i,
                         "user_id": r[0],
                         "activity_points": r[1],
                         "helpful_reactions": r[2],
                         "streak_days": r[3],
                         "total_score": r[4]
                     }
-                    for r in rankings
+                    for i, r in enumerate(rankings, 1)
                 ]
 
     def implement_smart_reminders(self, user_id: int, reminder_text: str, context_based_delay: str) -> Dict[str, Any]:
@@ -180,26 +299,11 @@ class BotDatabase:
         """
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Create reminders table if it doesn't exist
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS smart_reminders (
-                        id SERIAL PRIMARY KEY,
-                        user_id BIGINT,
-                        reminder_text TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        scheduled_for TIMESTAMP,
-                        context TEXT,
-                        status TEXT DEFAULT 'pending'
-                    )
-                """)
-                
                 # Analyze user activity patterns to determine best reminder time
                 cur.execute("""
-                    SELECT EXTRACT(HOUR FROM timestamp) as hour,
-                           COUNT(*) as activity_count
-                    FROM user_activities
+                    SELECT hour, activity_count
+                    FROM user_activity_hourly
                     WHERE user_id = %s
-                    GROUP BY hour
                     ORDER BY activity_count DESC
                     LIMIT 1
                 """, (user_id,))
@@ -222,245 +326,630 @@ class BotDatabase:
                 cur.execute("""
                     INSERT INTO smart_reminders (user_id, reminder_text, scheduled_for, context)
                     VALUES (%s, %s, %s, %s)
-                    RETURNING id, scheduled_for
+                    RETURNING id
                 """, (user_id, reminder_text, reminder_time, context_based_delay))
                 
-                reminder_id, scheduled_time = cur.fetchone()
+                reminder_id = cur.fetchone()[0]
                 conn.commit()
                 
                 return {
                     "reminder_id": reminder_id,
-                    "scheduled_for": scheduled_time,
+                    "user_id": user_id,
+                    "scheduled_for": reminder_time,
                     "text": reminder_text,
                     "context": context_based_delay
                 }
 
-    def create_automatic_content_categorization(self, content: str) -> Dict[str, Any]:
+    def get_pending_reminders(self, after: datetime, until: datetime) -> list:
+        """
+        Pending reminders due in (after, until], earliest first.
+        Pass after=None to include everything overdue.
+        :return: (id, user_id, reminder_text, scheduled_for) tuples
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                if after is None:
+                    cur.execute("""
+                        SELECT id, user_id, reminder_text, scheduled_for
+                        FROM smart_reminders
+                        WHERE status = 'pending' AND scheduled_for <= %s
+                        ORDER BY scheduled_for
+                    """, (until,))
+                else:
+                    cur.execute("""
+                        SELECT id, user_id, reminder_text, scheduled_for
+                        FROM smart_reminders
+                        WHERE status = 'pending' AND scheduled_for > %s AND scheduled_for <= %s
+                        ORDER BY scheduled_for
+                    """, (after, until))
+                return cur.fetchall()
+
+    def mark_reminders(self, reminder_ids: List[int], status: str) -> None:
+        """Set the status of many reminders in one statement"""
+        if not reminder_ids:
+            return
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE smart_reminders SET status = %s WHERE id = ANY(%s)
+                """, (status, list(reminder_ids)))
+
+    def create_automatic_content_categorization(self, content: str, guild_id: Optional[int] = None,
+                                                user_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Automatically categorizes user content using keyword analysis and stores
         it for improved search and organization
         """
+        return self.categorize_contents([content], guild_id, user_id)[0]
+
+    def categorize_contents(self, contents: List[str], guild_id: Optional[int] = None,
+                            user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Categorize and store many messages at once, e.g. to backfill history.
+        All rows go in through one multi-row INSERT. guild_id (None for direct
+        messages) and user_id decide who can find them with search_categorized_content.
+        """
+        if not contents:
+            return []
+        results = self.categorizer.categorize_many(contents)
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Create necessary tables
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS content_categories (
-                        id SERIAL PRIMARY KEY,
-                        content TEXT,
-                        categories JSONB,
-                        keywords TEXT[],
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Simple keyword-based categorization
-                categories = []
-                keywords = []
-                
-                # Example category rules (expand based on your needs)
-                if any(word in content.lower() for word in ['help', 'question', 'how', 'what']):
-                    categories.append('support')
-                if any(word in content.lower() for word in ['bug', 'error', 'issue', 'problem']):
-                    categories.append('bug-report')
-                if any(word in content.lower() for word in ['feature', 'suggestion', 'idea']):
-                    categories.append('feature-request')
-                
-                # Extract potential keywords (simple implementation)
-                words = content.lower().split()
-                keywords = [word for word in words if len(word) > 4][:5]  # Simple keyword extraction
-                
-                # Store categorized content
-                cur.execute("""
-                    INSERT INTO content_categories (content, categories, keywords)
-                    VALUES (%s, %s, %s)
+                ids = self._insert_values(cur, """
+                    INSERT INTO content_categories (content, categories, keywords, guild_id, user_id)
+                    VALUES %s
                     RETURNING id
-                """, (content, json.dumps({"categories": categories}), keywords))
-                
-                content_id = cur.fetchone()[0]
-                conn.commit()
-                
-                return {
-                    "content_id": content_id,
-                    "categories": categories,
-                    "keywords": keywords
-                }
-                
-                
+                """, [
+                    (content, json.dumps({"categories": categories}), keywords, guild_id, user_id)
+                    for content, (categories, keywords) in zip(contents, results)
+                ], page_size=1000, fetch=True)
+
+        return [
+            {
+                "content_id": content_id,
+                "categories": categories,
+                "keywords": keywords
+            }
+            for (content_id,), (categories, keywords) in zip(ids, results)
+        ]
 
-    def setup_conversation_table(self):
-        """Setup the conversation history table"""
+    def migrate(self) -> int:
+        """Bring the schema up to date; called once at startup"""
         with self.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS gpt_conversation_history (
-                        id SERIAL PRIMARY KEY,
-                        user_id BIGINT,
-                        channel_id BIGINT,
-                        message TEXT,
-                        bot_response TEXT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        context_used TEXT[]
-                    )
-                """)
-                conn.commit()
+            return run_migrations(conn)
 
     def store_conversation(self, user_id: int, channel_id: int, message: str, bot_response: str, context_used: list) -> None:
         """Store a conversation entry in the database"""
+        timestamp = datetime.now()
+        self.store_conversations([(user_id, channel_id, message, bot_response, context_used, timestamp)])
+        self.history_cache.append(user_id, channel_id, message, bot_response, timestamp)
+
+    def store_conversations(self, rows: list) -> None:
+        """
+        Store many conversation entries with one multi-row INSERT.
+        Context texts are written once per conversation into conversation_context
+        and each entry keeps only their digests.
+        Used by ConversationWriter, which updates history_cache when it queues a turn.
+        :param rows: (user_id, channel_id, message, bot_response, context_used, timestamp) tuples
+        """
+        if not rows:
+            return
+        contexts = {}
+        history_rows = []
+        for user_id, channel_id, message, bot_response, context_used, timestamp in rows:
+            digests = []
+            for content in context_used or []:
+                digest = context_digest(content)
+                contexts[(user_id, channel_id, digest)] = content
+                digests.append(digest)
+            history_rows.append((user_id, channel_id, message, bot_response, digests, timestamp))
+
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
+                if contexts:
+                    self._insert_values(cur, """
+                        INSERT INTO conversation_context (user_id, channel_id, digest, content)
+                        VALUES %s
+                        ON CONFLICT DO NOTHING
+                    """, [(u, c, d, content) for (u, c, d), content in contexts.items()])
+                self._insert_values(cur, """
                     INSERT INTO gpt_conversation_history 
-                    (user_id, channel_id, message, bot_response, context_used)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (user_id, channel_id, message, bot_response, context_used))
-                conn.commit()
+                    (user_id, channel_id, message, bot_response, context_digests, timestamp)
+                    VALUES %s
+                """, history_rows)
 
-    def get_recent_conversations(self, user_id: int, channel_id: int, limit: int = 5) -> list:
-        """Retrieve recent conversations for context"""
+    def get_context_used(self, conversation_id: int) -> List[str]:
+        """Rebuild the context texts that were sent with a stored conversation entry"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
-                    SELECT message, bot_response
+                    SELECT c.content
+                    FROM gpt_conversation_history h
+                    CROSS JOIN unnest(h.context_digests) WITH ORDINALITY AS u(digest, ord)
+                    JOIN conversation_context c
+                      ON c.user_id = h.user_id AND c.channel_id = h.channel_id AND c.digest = u.digest
+                    WHERE h.id = %s
+                    ORDER BY u.ord
+                """, (conversation_id,))
+                return [row[0] for row in cur.fetchall()]
+
+    def get_recent_conversations(self, user_id: int, channel_id: int, limit: int = 5,
+                                 after: datetime = None) -> list:
+        """
+        Retrieve recent conversations for context, newest first
+        :param after: only turns newer than this, e.g. the end of the conversation summary
+        """
+        since = datetime.now() - self.history_lookback if self.history_lookback else None
+        cached = self.history_cache.get(user_id, channel_id, limit, since, after)
+        if cached is not None:
+            return cached
+
+        # Read a full ring's worth so the next calls are served from memory
+        fetch = max(limit, self.history_cache.turns_per_key)
+        condition, params = "", (user_id, channel_id)
+        if since is not None:
+            condition, params = condition + " AND timestamp >= %s", params + (since,)
+        if after is not None:
+            condition, params = condition + " AND timestamp > %s", params + (after,)
+        params += (fetch,)
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT message, bot_response, timestamp
                     FROM gpt_conversation_history
-                    WHERE user_id = %s AND channel_id = %s
+                    WHERE user_id = %s AND channel_id = %s {condition}
                     ORDER BY timestamp DESC
                     LIMIT %s
-                """, (user_id, channel_id, limit))
-                return cur.fetchall()
+                """, params)
+                rows = cur.fetchall()
+
+        # A read cut off by `after` is not the newest ring's worth in general
+        if fetch == self.history_cache.turns_per_key and (after is None or len(rows) == fetch):
+            self.history_cache.load(user_id, channel_id, rows)
+        return [(message, bot_response) for message, bot_response, *_ in rows[:limit]]
+
+    def get_conversation_page(self, user_id: int, channel_id: int, limit: int, before: tuple = None) -> List[Dict[str, Any]]:
+        """
+        One page of a user's conversation history in a channel, newest first
+        :param before: (timestamp, id) of the last entry of the previous page
+        """
+        if before is None:
+            condition, params = "", (user_id, channel_id, limit)
+        else:
+            condition, params = "AND (timestamp, id) < (%s, %s)", (user_id, channel_id, before[0], before[1], limit)
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT id, message, bot_response, timestamp
+                    FROM gpt_conversation_history
+                    WHERE user_id = %s AND channel_id = %s {condition}
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT %s
+                """, params)
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
 
     def clear_user_history(self, user_id: int, channel_id: int) -> None:
         """Clear conversation history for a user in a specific channel"""
+        self.history_cache.invalidate(user_id, channel_id)
         with self.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     DELETE FROM gpt_conversation_history
                     WHERE user_id = %s AND channel_id = %s
                 """, (user_id, channel_id))
+                cur.execute("""
+                    DELETE FROM conversation_context
+                    WHERE user_id = %s AND channel_id = %s
+                """, (user_id, channel_id))
+                cur.execute("""
+                    DELETE FROM conversation_summaries
+                    WHERE user_id = %s AND channel_id = %s
+                """, (user_id, channel_id))
                 conn.commit()
+        # A read racing the DELETE may have reloaded the old turns
+        self.history_cache.invalidate(user_id, channel_id)
                 
+    def get_conversation_summary(self, user_id: int, channel_id: int) -> Optional[Dict[str, Any]]:
+        """The rolling summary of a user's older turns in a channel, or None"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT summary, turns_covered, covered_until, covered_id, updated_at
+                    FROM conversation_summaries
+                    WHERE user_id = %s AND channel_id = %s
+                """, (user_id, channel_id))
+                row = cur.fetchone()
+                if row is None:
+                    return None
+                columns = [desc[0] for desc in cur.description]
+                return dict(zip(columns, row))
+
+    def get_turns_to_summarize(self, user_id: int, channel_id: int, keep: int, limit: int,
+                               after: tuple = None) -> List[Dict[str, Any]]:
+        """
+        Oldest-first turns that can be folded into the summary: everything
+        after the summary's (timestamp, id) mark except the newest `keep` turns
+        :param after: (covered_until, covered_id) of the current summary
+        """
+        if after is None:
+            condition, params = "", (user_id, channel_id)
+        else:
+            condition, params = "AND (timestamp, id) > (%s, %s)", (user_id, channel_id, after[0], after[1])
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT COUNT(*)
+                    FROM gpt_conversation_history
+                    WHERE user_id = %s AND channel_id = %s {condition}
+                """, params)
+                foldable = cur.fetchone()[0] - keep
+                if foldable <= 0:
+                    return []
+                cur.execute(f"""
+                    SELECT id, timestamp, message, bot_response
+                    FROM gpt_conversation_history
+                    WHERE user_id = %s AND channel_id = %s {condition}
+                    ORDER BY timestamp, id
+                    LIMIT %s
+                """, (*params, min(foldable, limit)))
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def save_conversation_summary(self, user_id: int, channel_id: int, summary: str, turns_covered: int,
+                                  covered_until: datetime, covered_id: int, previous_id: int = None) -> bool:
+        """
+        Replace the rolling summary; covered_* mark the newest turn folded into it.
+        Only saved while that turn still exists and the stored summary still
+        ends at `previous_id` (None: no summary yet), so a compaction that
+        raced a clear or another compaction changes nothing. Returns whether it was saved.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO conversation_summaries
+                    (user_id, channel_id, summary, turns_covered, covered_until, covered_id, updated_at)
+                    SELECT %s, %s, %s, %s, %s, %s, %s
+                    WHERE EXISTS (
+                        SELECT 1 FROM gpt_conversation_history
+                        WHERE user_id = %s AND channel_id = %s AND timestamp = %s AND id = %s
+                    )
+                    ON CONFLICT (user_id, channel_id) DO UPDATE SET
+                        summary = EXCLUDED.summary,
+                        turns_covered = EXCLUDED.turns_covered,
+                        covered_until = EXCLUDED.covered_until,
+                        covered_id = EXCLUDED.covered_id,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE conversation_summaries.covered_id = %s
+                """, (user_id, channel_id, summary, turns_covered, covered_until, covered_id, datetime.now(),
+                      user_id, channel_id, covered_until, covered_id, previous_id))
+                return cur.rowcount > 0
+
+    def get_response_cache_opt_outs(self) -> List[int]:
+        """Guilds whose mentions never use the response cache"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT guild_id FROM response_cache_opt_outs")
+                return [row[0] for row in cur.fetchall()]
+
+    def set_response_cache_opt_out(self, guild_id: int, opted_out: bool) -> None:
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                if opted_out:
+                    cur.execute("""
+                        INSERT INTO response_cache_opt_outs (guild_id, opted_out_at)
+                        VALUES (%s, %s)
+                        ON CONFLICT (guild_id) DO NOTHING
+                    """, (guild_id, datetime.now()))
+                else:
+                    cur.execute("DELETE FROM response_cache_opt_outs WHERE guild_id = %s", (guild_id,))
+
+    def maintain_conversation_partitions(self, today: date = None) -> Dict[str, List[str]]:
+        """
+        Create the upcoming monthly history partitions and, when a retention
+        period is configured, drop the partitions that fall entirely before it.
+        Context texts no remaining history entry refers to are removed along with them.
+        """
+        current = month_start(today or date.today())
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                created = ensure_partitions(cur, current, MONTHS_AHEAD + 1)
+                dropped = []
+                if self.retention_months > 0:
+                    cutoff = add_months(current, -self.retention_months)
+                    dropped = drop_partitions_before(cur, cutoff)
+                    # Summaries of nothing but expired turns expire with them
+                    cur.execute("DELETE FROM conversation_summaries WHERE covered_until < %s", (cutoff,))
+                if dropped:
+                    # One pass over the remaining history, hash anti-joined against the contexts
+                    cur.execute("""
+                        WITH referenced AS (
+                            SELECT DISTINCT h.user_id, h.channel_id, d.digest
+                            FROM gpt_conversation_history h
+                            CROSS JOIN unnest(h.context_digests) AS d(digest)
+                        )
+                        DELETE FROM conversation_context c
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM referenced r
+                            WHERE r.user_id = c.user_id AND r.channel_id = c.channel_id AND r.digest = c.digest
+                        )
+                    """)
+        if dropped:
+            self.history_cache.clear()
+        return {"created": created, "dropped": dropped}
+
+    def search_conversations(self, user_id: int, channel_id: int, query: str, limit: int = 5,
+                             after: tuple = None) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over a user's conversation history in one channel,
+        so results never leave the channel they were said in.
+        :param after: (rank, id) of the last result of the previous page
+        """
+        return self._search("""
+            SELECT id, rank, message, bot_response, timestamp
+            FROM (
+                SELECT id, ts_rank(search_vector, q)::float8 AS rank, message, bot_response, timestamp
+                FROM gpt_conversation_history, websearch_to_tsquery('english', %s) q
+                WHERE user_id = %s AND channel_id = %s AND search_vector @@ q
+            ) matches
+        """, (query, user_id, channel_id), limit, after)
+
+    def search_categorized_content(self, query: str, guild_id: Optional[int], user_id: int, limit: int = 5,
+                                   after: tuple = None) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over the categorized content of one guild,
+        or of the user's own direct messages when guild_id is None.
+        :param after: (rank, id) of the last result of the previous page
+        """
+        scope, scope_params = content_scope(guild_id, user_id)
+        return self._search(f"""
+            SELECT id, rank, content, categories, created_at
+            FROM (
+                SELECT id, ts_rank(search_vector, q)::float8 AS rank, content, categories, created_at
+                FROM content_categories, websearch_to_tsquery('english', %s) q
+                WHERE search_vector @@ q AND {scope}
+            ) matches
+        """, (query, *scope_params), limit, after)
+
+    def _search(self, select: str, params: tuple, limit: int, after: tuple) -> List[Dict[str, Any]]:
+        # Keyset pagination on (rank, id): each page continues below the last row seen
+        if after is None:
+            query = select + " ORDER BY rank DESC, id DESC LIMIT %s"
+            params = params + (limit,)
+        else:
+            query = select + " WHERE (rank, id) < (%s, %s) ORDER BY rank DESC, id DESC LIMIT %s"
+            params = params + (after[0], after[1], limit)
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [desc[0] for desc in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+
     def save_feedback(self, user, rating, feedback):
         """
-        Check if feedback table exists, create if not, and then save feedback.
+        Save a feedback entry.
 
         :param user: Discord user (as string)
         :param rating: Rating value (1-10)
         :param feedback: Feedback text
         :return: True if successful, False otherwise
         """
-        # Table creation query
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS feedback (
-            id SERIAL PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 10),
-            feedback_text TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-
         # Feedback insertion query
         insert_query = """
         INSERT INTO feedback (user_id, rating, feedback_text) 
         VALUES (%s, %s, %s)
         """
 
-        connection = None
         try:
-            # Get database connection
-            connection = self.get_connection()
-            cursor = connection.cursor()
-
-            # Ensure table exists
-            cursor.execute(create_table_query)
-            connection.commit()
-
-            # Insert feedback
-            cursor.execute(insert_query, (str(user), rating, feedback))
-            connection.commit()
+            with self.get_connection() as connection:
+                with connection.cursor() as cursor:
+                    # Insert feedback
+                    cursor.execute(insert_query, (str(user), rating, feedback))
+                    self._bump_feedback_stats(cursor, rating)
             return True
 
         except (Exception, psycopg2.Error) as error:
             print(f"Error in save_feedback: {error}")
-            if connection:
-                connection.rollback()
+            self.metrics.note_error()
             return False
-
-        finally:
-            if connection:
-                cursor.close()
-                self.release_connection(connection)
                 
+    def _bump_feedback_stats(self, cursor, rating: int):
+        # Running totals, updated in the same transaction as the insert
+        cursor.execute("""
+            UPDATE feedback_stats
+            SET rating_count = rating_count + 1,
+                rating_sum = rating_sum + %s,
+                histogram[%s] = histogram[%s] + 1
+            WHERE id = 1
+        """, (rating, rating, rating))
+
+    def _read_rating_stats(self, cursor) -> tuple:
+        """(count, sum, [count of each rating 1-10]) from the running totals"""
+        cursor.execute("SELECT rating_count, rating_sum, histogram FROM feedback_stats WHERE id = 1")
+        return cursor.fetchone()
+
+    FEEDBACK_COLUMNS = ("id", "user_id", "rating", "feedback_text", "timestamp")
+
     def get_feedback(self, limit=None):
         """ 
-        Retrieve feedback from the database 
+        Retrieve feedback from the database, newest first
         :param limit: Optional limit on number of feedback entries to retrieve
         :return: List of feedback dictionaries 
         """
-        connection = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
             if limit:
-                query = """
-                SELECT id, user_id, rating, feedback_text, timestamp 
-                FROM feedback 
-                ORDER BY timestamp DESC 
-                LIMIT %s
-                """
-                cursor.execute(query, (limit,))
-            else:
-                query = """
-                SELECT id, user_id, rating, feedback_text, timestamp 
-                FROM feedback 
-                ORDER BY timestamp DESC
-                """
-                cursor.execute(query)
-            
-            # Fetch column names
-            columns = [desc[0] for desc in cursor.description]
-            
-            # Convert results to list of dictionaries
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            return results
+                return self.get_feedback_page(limit)
+            return list(self.iter_feedback())
         
         except (Exception, psycopg2.Error) as error:
             print(f"Error retrieving feedback: {error}")
+            self.metrics.note_error()
             return []
-        
-        finally:
-            if connection:
-                cursor.close()
-                self.release_connection(connection)
+
+    def iter_feedback(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every feedback entry, newest first, through a server-side cursor.
+        Only `batch_size` rows are held in memory at a time; the pooled
+        connection stays checked out until the generator is exhausted or closed.
+        Iteration blocks, so async callers should use get_feedback_page instead.
+        """
+        with self.get_connection() as connection:
+            with connection.cursor(name="feedback_stream") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute("""
+                    SELECT id, user_id, rating, feedback_text, timestamp
+                    FROM feedback
+                    ORDER BY id DESC
+                """)
+                for row in cursor:
+                    yield dict(zip(self.FEEDBACK_COLUMNS, row))
+
+    def get_feedback_page(self, limit: int, before_id: int = None) -> List[Dict[str, Any]]:
+        """
+        One page of feedback, newest first
+        :param before_id: id of the last entry of the previous page
+        """
+        if before_id is None:
+            condition, params = "", (limit,)
+        else:
+            condition, params = "WHERE id < %s", (before_id, limit)
+        with self.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT id, user_id, rating, feedback_text, timestamp
+                    FROM feedback
+                    {condition}
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, params)
+                return [dict(zip(self.FEEDBACK_COLUMNS, row)) for row in cursor.fetchall()]
     
     def get_average_rating(self):
         """ 
         Calculate the average feedback rating 
         :return: Average rating or None if no ratings 
         """
-        connection = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            cursor.execute('SELECT AVG(rating) as avg_rating FROM feedback')
-            result = cursor.fetchone()
-            
-            return float(result[0]) if result[0] is not None else None
+            with self.get_connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT CAST(rating_sum AS DOUBLE PRECISION) / NULLIF(rating_count, 0) FROM feedback_stats WHERE id = 1
+                    """)
+                    result = cursor.fetchone()
+                    
+                    return float(result[0]) if result and result[0] is not None else None
         
         except (Exception, psycopg2.Error) as error:
             print(f"Error calculating average rating: {error}")
+            self.metrics.note_error()
             return None
-        
-        finally:
-            if connection:
-                cursor.close()
-                self.release_connection(connection)
+
+    def get_rating_distribution(self) -> Dict[str, Any]:
+        """
+        Rating count, average, 1-10 histogram and percentiles, all derived
+        from the single feedback_stats row
+        """
+        try:
+            with self.get_connection() as connection:
+                with connection.cursor() as cursor:
+                    result = self._read_rating_stats(cursor)
+        except (Exception, psycopg2.Error) as error:
+            print(f"Error retrieving rating distribution: {error}")
+            self.metrics.note_error()
+            return None
+
+        count, total, histogram = result if result else (0, 0, [0] * 10)
+        return {
+            "count": count,
+            "average": total / count if count else None,
+            "histogram": {rating: histogram[rating - 1] for rating in range(1, 11)},
+            "percentiles": {p: rating_percentile(histogram, p) for p in (25, 50, 75, 90)},
+        }
+
+def rating_percentile(histogram: List[int], percentile: float):
+    """Smallest rating with at least `percentile`% of ratings at or below it"""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = total * percentile / 100
+    running = 0
+    for rating, count in enumerate(histogram, 1):
+        running += count
+        if running >= threshold:
+            return rating
+    return len(histogram)
+
+class AsyncBotDatabase:
+    """
+    Awaitable version of BotDatabase with the same method names.
+    Calls run on a thread pool no larger than the connection pool, so a slow
+    query waits its turn there instead of blocking the event loop. Every call
+    is recorded in the database's QueryMetrics.
+    """
+    def __init__(self, db: BotDatabase, max_workers: int = None):
+        self.db = db
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or db.pool.maxconn,
+            thread_name_prefix="botdb"
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        timed = self.db.metrics.timed(name, attr)
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(timed, *args, **kwargs)
+        return call
+
+    def close(self):
+        """Wait for queued queries, then close the pool"""
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+_shared_database = None
+_shared_async_database = None
+_shared_database_lock = threading.Lock()
+
+def create_database() -> BotDatabase:
+    """Build the backend named by DATABASE_BACKEND: postgres (default) or sqlite"""
+    load_dotenv()
+    backend = os.getenv("DATABASE_BACKEND", "postgres").lower()
+    if backend == "sqlite":
+        from cogs.sqlitedb import SQLiteBotDatabase
+        return SQLiteBotDatabase()
+    if backend != "postgres":
+        raise ValueError(f"Unknown DATABASE_BACKEND: {backend}")
+    return BotDatabase()
+
+def get_database() -> BotDatabase:
+    """Return the process-wide BotDatabase so every cog shares one pool"""
+    global _shared_database
+    with _shared_database_lock:
+        if _shared_database is None:
+            _shared_database = create_database()
+        return _shared_database
+
+def get_async_database() -> AsyncBotDatabase:
+    """Return the process-wide AsyncBotDatabase wrapping get_database()"""
+    global _shared_async_database
+    db = get_database()
+    with _shared_database_lock:
+        if _shared_async_database is None:
+            _shared_async_database = AsyncBotDatabase(db)
+        return _shared_async_database
 
 class CogDBMS(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.db = BotDatabase()
+        self.db = get_async_database()
         print("Database cog initialized!")
 
     @commands.Cog.listener()
@@ -472,17 +961,96 @@ class CogDBMS(commands.Cog):
     async def db_status(self, ctx):
         """Check if the database connection is working"""
         try:
-            with self.db.get_connection() as conn:
-                await ctx.send("✅ Database connection successful!")
+            started = time.perf_counter()
+            await self.db.ping()
+            round_trip_ms = (time.perf_counter() - started) * 1000
+            stats = await self.db.pool_stats()
+            cache = self.db.history_cache.stats()
+            status = (
+                f"✅ Database connection successful! Round trip: {round_trip_ms:.1f} ms\n"
+                f"Pool: {stats['in_use']} in use, {stats['idle']} idle "
+                f"(min {stats['min']}, max {stats['max']}), "
+                f"{stats['checkouts']} checkouts, {stats['waits']} waits\n"
+                f"History cache: {cache['hit_rate']:.0%} hit rate "
+                f"({cache['hits']} hits, {cache['misses']} misses, {cache['keys']} conversations)"
+            )
+            compactor = getattr(self.bot, "conversation_compactor", None)
+            if compactor is not None:
+                summaries = compactor.stats()
+                status += (
+                    f"\nSummaries: {summaries['compactions']} compactions, {summaries['turns_folded']} turns folded, "
+                    f"{summaries['failures']} failures, {summaries['running']} running, "
+                    f"{summaries['pending']} conversations counting"
+                )
+            await ctx.send(status)
         except Exception as e:
-            await ctx.send(f"❌ Database connection failed: {str(e)}")
+            breaker = self.db.breaker.stats()
+            await ctx.send(
+                f"❌ Database connection failed: {str(e)}\n"
+                f"Circuit {breaker['state']}, {breaker['trips']} trips so far"
+            )
+
+    @commands.command(name="dbstats")
+    @commands.has_permissions(administrator=True)
+    async def db_stats(self, ctx):
+        """Show latency percentiles, rows and errors per database method"""
+        methods = self.db.metrics.snapshot()
+        if not methods:
+            await ctx.send("No database calls have been recorded yet.")
+            return
+
+        embed = discord.Embed(title="Database Query Stats", color=discord.Color.blue())
+        for method in methods[:20]:
+            embed.add_field(
+                name=method['method'],
+                value=(
+                    f"p50 {method['p50'] * 1000:.1f} ms · p95 {method['p95'] * 1000:.1f} ms · "
+                    f"p99 {method['p99'] * 1000:.1f} ms\n"
+                    f"{method['calls']} calls · {method['errors']} errors · {method['rows']} rows · "
+                    f"pool wait {method['avg_pool_wait'] * 1000:.1f} ms avg"
+                ),
+                inline=False
+            )
+        embed.set_footer(text="Percentiles are bucket upper bounds (within 19%)")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="response_cache")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def response_cache(self, ctx, setting: str = None):
+        """Turn reply caching on or off for this server, or show its hit rate
+        example - !response_cache off"""
+        cache = getattr(self.bot, "response_cache", None)
+        if cache is None:
+            await ctx.send("The response cache is not available.")
+            return
+        if setting is not None:
+            setting = setting.lower()
+            if setting not in ("on", "off"):
+                await ctx.send("Usage: !response_cache [on|off]")
+                return
+            try:
+                await self.db.set_response_cache_opt_out(ctx.guild.id, setting == "off")
+            except Exception as e:
+                await ctx.send("Failed to save the response cache setting.")
+                print(f"Error saving response cache opt-out: {e}")
+                return
+            cache.set_enabled(ctx.guild.id, setting == "on")
+
+        stats = cache.stats()
+        state = "on" if cache.enabled_for(ctx.guild.id) else "off"
+        await ctx.send(
+            f"Response cache is {state} for this server.\n"
+            f"{stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, {stats['misses']} misses), "
+            f"{stats['entries']} cached replies, {stats['expirations']} expired, {stats['evictions']} evicted"
+        )
 
     @commands.command()
     async def track_activity(self, ctx, member: discord.Member = None):
         """Track activity patterns for a user - example - !track_activity @User123"""
         try:
             user = member or ctx.author
-            patterns = self.db.track_user_activity_patterns(user.id)
+            patterns = await self.db.track_user_activity_patterns(user.id)
             
             embed = discord.Embed(title=f"Activity Patterns for {user.display_name}", color=discord.Color.blue())
             
@@ -492,8 +1060,8 @@ class CogDBMS(commands.Cog):
             embed.add_field(name="Peak Activity Hours", value=peak_hours_str or "No data", inline=False)
             
             # Popular Commands
-            commands_str = "\n".join([f"{cmd}: used {count} times" 
-                                    for cmd, count in patterns['popular_commands']])
+            commands_str = "\n".join([f"{data['command']}: used {data['count']} times" 
+                                    for data in patterns['popular_commands']])
             embed.add_field(name="Most Used Commands", value=commands_str or "No data", inline=False)
             
             await ctx.send(embed=embed)
@@ -504,7 +1072,7 @@ class CogDBMS(commands.Cog):
     async def remember_context(self, ctx, *, context: str):
         """Store a context in the bot's memory - example - !remember_context This is text"""
         try:
-            memories = self.db.implement_context_memory(ctx.author.id, context)
+            memories = await self.db.implement_context_memory(ctx.author.id, context)
             
             embed = discord.Embed(title="Memory Updated", color=discord.Color.green())
             embed.add_field(name="Latest Memories", 
@@ -515,28 +1083,57 @@ class CogDBMS(commands.Cog):
         except Exception as e:
             await ctx.send(f"Error storing memory: {str(e)}")
 
+    async def resolve_display_names(self, guild, user_ids: List[int]) -> Dict[int, str]:
+        """Look up display names from the caches, then fetch the rest in one gateway request"""
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id) if guild else None
+            user = member or self.bot.get_user(user_id)
+            if user:
+                names[user_id] = user.display_name
+            else:
+                missing.append(user_id)
+
+        if guild and missing:
+            try:
+                for member in await guild.query_members(user_ids=missing, limit=len(missing)):
+                    names[member.id] = member.display_name
+            except Exception as e:
+                print(f"Error resolving member names: {e}")
+        return names
+
     @commands.command()
     async def show_rankings(self, ctx):
-        """Display user rankings"""
-        try:
-            rankings = self.db.create_dynamic_user_rankings()
-            
+        """Page through user rankings, 10 per page
+        example - !show_rankings"""
+        per_page = 10
+
+        async def fetch_page(after):
+            rankings = await self.db.create_dynamic_user_rankings(per_page, after)
+            names = await self.resolve_display_names(ctx.guild, [rank['user_id'] for rank in rankings])
+            for rank in rankings:
+                rank['name'] = names.get(rank['user_id'], f"User {rank['user_id']}")
+            last = rankings[-1] if len(rankings) == per_page else None
+            return rankings, (last['total_score'], last['user_id'], last['rank']) if last else None
+
+        def render(rankings, page):
             embed = discord.Embed(title="User Rankings", color=discord.Color.gold())
-            
-            for i, rank in enumerate(rankings, 1):
-                user = self.bot.get_user(rank['user_id'])
-                username = user.display_name if user else f"User {rank['user_id']}"
-                
+            for rank in rankings:
                 embed.add_field(
-                    name=f"#{i} {username}",
+                    name=f"#{rank['rank']} {rank['name']}",
                     value=f"Score: {rank['total_score']:.1f}\n"
                           f"Activity: {rank['activity_points']}\n"
                           f"Helpful: {rank['helpful_reactions']}\n"
                           f"Streak: {rank['streak_days']} days",
                     inline=True
                 )
-            
-            await ctx.send(embed=embed)
+            embed.set_footer(text=f"Page {page}")
+            return embed
+
+        try:
+            if not await KeysetPaginator(ctx.author.id, fetch_page, render).start(ctx):
+                await ctx.send("No rankings yet.")
         except Exception as e:
             await ctx.send(f"Error fetching rankings: {str(e)}")
 
@@ -550,11 +1147,12 @@ class CogDBMS(commands.Cog):
                 await ctx.send("Invalid delay! Use: urgent, today, tomorrow, or week")
                 return
             
-            reminder = self.db.implement_smart_reminders(
+            reminder = await self.db.implement_smart_reminders(
                 ctx.author.id, 
                 reminder_text,
                 delay
             )
+            self.bot.dispatch("reminder_created", reminder)
             
             embed = discord.Embed(title="Reminder Set", color=discord.Color.blue())
             embed.add_field(name="Text", value=reminder['text'], inline=False)
@@ -569,7 +1167,9 @@ class CogDBMS(commands.Cog):
     async def categorize_message(self, ctx, *, content: str):
         """Categorize a message's content - example - !categorize_message Hello there is a bug in the x command"""
         try:
-            result = self.db.create_automatic_content_categorization(content)
+            result = await self.db.create_automatic_content_categorization(
+                content, ctx.guild.id if ctx.guild else None, ctx.author.id
+            )
             
             embed = discord.Embed(title="Content Categorization", color=discord.Color.purple())
             embed.add_field(name="Categories", 
@@ -587,44 +1187,107 @@ class CogDBMS(commands.Cog):
     async def clear_context(self,ctx):
         """Clear conversation history for the user"""
         try:
-            self.db.clear_user_history(ctx.author.id, ctx.channel.id)
+            writer = getattr(self.bot, "conversation_writer", None)
+            if writer is not None:
+                await writer.discard(ctx.author.id, ctx.channel.id)
+            compactor = getattr(self.bot, "conversation_compactor", None)
+            if compactor is not None:
+                await compactor.forget(ctx.author.id, ctx.channel.id)
+            await self.db.clear_user_history(ctx.author.id, ctx.channel.id)
             await ctx.send("Your conversation history has been cleared!")
         except Exception as e:
             await ctx.send("Failed to clear conversation history.")
             print(f"Error clearing history: {e}")
 
     @commands.command()
-    async def show_context(self,ctx, limit: int = 5):
-        """Show recent conversation history
+    async def show_context(self,ctx, per_page: int = 5):
+        """Page through your conversation history
         example - !show_context 10"""
-        try:
-            conversations = self.db.get_recent_conversations(
-                ctx.author.id,
-                ctx.channel.id,
-                limit
-            )
-            
-            if not conversations:
-                await ctx.send("No conversation history found.")
-                return
-                
+        per_page = max(1, min(per_page, 10))
+
+        async def fetch_page(before):
+            conversations = await self.db.get_conversation_page(ctx.author.id, ctx.channel.id, per_page, before)
+            cursor = (conversations[-1]['timestamp'], conversations[-1]['id']) if len(conversations) == per_page else None
+            return conversations, cursor
+
+        def render(conversations, page):
             embed = discord.Embed(title="Recent Conversations", color=discord.Color.blue())
-            for i, (msg, response) in enumerate(conversations, 1):
+            for i, conversation in enumerate(conversations, (page - 1) * per_page + 1):
                 embed.add_field(
                     name=f"Conversation {i}",
-                    value=f"You: {msg[:100]}...\nBot: {response[:100]}...",
+                    value=f"You: {conversation['message'][:100]}...\nBot: {conversation['bot_response'][:100]}...",
                     inline=False
                 )
-            await ctx.send(embed=embed)
+            embed.set_footer(text=f"Page {page}")
+            return embed
+
+        try:
+            if not await KeysetPaginator(ctx.author.id, fetch_page, render).start(ctx):
+                await ctx.send("No conversation history found.")
         except Exception as e:
             await ctx.send("Failed to retrieve conversation history.")
             print(f"Error showing history: {e}")
             
+    @commands.command()
+    async def search(self, ctx, *, query: str):
+        """Search your conversation history with the bot in this channel
+        example - !search python decorators"""
+        per_page = 5
+
+        async def fetch_page(after):
+            results = await self.db.search_conversations(ctx.author.id, ctx.channel.id, query, per_page, after)
+            cursor = (results[-1]['rank'], results[-1]['id']) if len(results) == per_page else None
+            return results, cursor
+
+        def render(results, page):
+            embed = discord.Embed(title=f"Search: {query[:200]}", color=discord.Color.blue())
+            for result in results:
+                embed.add_field(
+                    name=result['timestamp'].strftime('%Y-%m-%d %H:%M'),
+                    value=f"You: {result['message'][:100]}...\nBot: {result['bot_response'][:100]}...",
+                    inline=False
+                )
+            embed.set_footer(text=f"Page {page}")
+            return embed
+
+        try:
+            if not await KeysetPaginator(ctx.author.id, fetch_page, render).start(ctx):
+                await ctx.send("No matching conversations found.")
+        except Exception as e:
+            await ctx.send("Failed to search conversation history.")
+            print(f"Error searching history: {e}")
+
+    @commands.command()
+    async def search_content(self, ctx, *, query: str):
+        """Search content categorized in this server (or your own, in DMs)
+        example - !search_content login bug"""
+        per_page = 5
+        guild_id = ctx.guild.id if ctx.guild else None
+
+        async def fetch_page(after):
+            results = await self.db.search_categorized_content(query, guild_id, ctx.author.id, per_page, after)
+            cursor = (results[-1]['rank'], results[-1]['id']) if len(results) == per_page else None
+            return results, cursor
+
+        def render(results, page):
+            embed = discord.Embed(title=f"Content search: {query[:200]}", color=discord.Color.purple())
+            for result in results:
+                categories = ", ".join((result['categories'] or {}).get('categories', [])) or "uncategorized"
+                embed.add_field(name=categories, value=result['content'][:200], inline=False)
+            embed.set_footer(text=f"Page {page}")
+            return embed
+
+        try:
+            if not await KeysetPaginator(ctx.author.id, fetch_page, render).start(ctx):
+                await ctx.send("No matching content found.")
+        except Exception as e:
+            await ctx.send(f"Error searching content: {str(e)}")
+
     @commands.command()
     async def avg_rating(self, ctx):
         """Get the average feedback rating"""
         try:
-            avg_rating = self.db.get_average_rating()
+            avg_rating = await self.db.get_average_rating()
             
             if avg_rating is not None:
                 embed = discord.Embed(
@@ -639,16 +1302,43 @@ class CogDBMS(commands.Cog):
             await ctx.send(f"Error retrieving average rating: {str(e)}")
 
     @commands.command()
-    async def recent_feedback(self, ctx, limit: int = 5):
-        """Show recent feedback entries
-        example - !recent_feedback 10"""
+    async def rating_stats(self, ctx):
+        """Show the distribution of feedback ratings"""
         try:
-            feedbacks = self.db.get_feedback(limit)
-            
-            if not feedbacks:
-                await ctx.send("No feedback found.")
+            stats = await self.db.get_rating_distribution()
+            if not stats or not stats['count']:
+                await ctx.send("No ratings have been recorded yet.")
                 return
-            
+
+            peak = max(stats['histogram'].values())
+            bars = "\n".join(
+                f"`{rating:>2}` {'█' * round(10 * count / peak) if peak else ''} {count}"
+                for rating, count in stats['histogram'].items()
+            )
+            percentiles = ", ".join(f"p{p}: {value}" for p, value in stats['percentiles'].items())
+
+            embed = discord.Embed(
+                title="Feedback Rating Distribution",
+                description=f"⭐ {stats['average']:.2f} / 10 from {stats['count']} ratings",
+                color=discord.Color.gold()
+            )
+            embed.add_field(name="Ratings", value=bars, inline=False)
+            embed.add_field(name="Percentiles", value=percentiles, inline=False)
+            await ctx.send(embed=embed)
+        except Exception as e:
+            await ctx.send(f"Error retrieving rating distribution: {str(e)}")
+
+    @commands.command()
+    async def recent_feedback(self, ctx, per_page: int = 5):
+        """Page through feedback entries, newest first
+        example - !recent_feedback 10"""
+        per_page = max(1, min(per_page, 10))
+
+        async def fetch_page(before_id):
+            feedbacks = await self.db.get_feedback_page(per_page, before_id)
+            return feedbacks, feedbacks[-1]['id'] if len(feedbacks) == per_page else None
+
+        def render(feedbacks, page):
             embed = discord.Embed(title="Recent Feedback", color=discord.Color.blue())
             for feedback in feedbacks:
                 embed.add_field(
@@ -656,8 +1346,12 @@ class CogDBMS(commands.Cog):
                     value=feedback['feedback_text'][:100] + "...",
                     inline=False
                 )
-            
-            await ctx.send(embed=embed)
+            embed.set_footer(text=f"Page {page}")
+            return embed
+
+        try:
+            if not await KeysetPaginator(ctx.author.id, fetch_page, render).start(ctx):
+                await ctx.send("No feedback found.")
         except Exception as e:
             await ctx.send(f"Error retrieving feedback: {str(e)}")
 
@@ -0,0 +1,62 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CATEGORIES: Dict[str, List[str]] = {
+    "support": ["help", "question", "how", "what"],
+    "bug-report": ["bug", "error", "issue", "problem"],
+    "feature-request": ["feature", "suggestion", "idea"],
+}
+
+class ContentCategorizer:
+    """
+    Keyword rule engine for content categorization.
+
+    Every keyword of every category is compiled into a single alternation
+    regex with word boundaries (plain plurals included), so one pass over the
+    lowercased text finds all matches regardless of how many rules exist.
+    """
+    def __init__(self, categories: Optional[Dict[str, List[str]]] = None):
+        self.categories = dict(categories if categories is not None else DEFAULT_CATEGORIES)
+        self._keyword_categories: Dict[str, List[str]] = {}
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword.lower(), []).append(category)
+
+        # Longest first so "feature" is preferred over a shorter overlapping keyword
+        alternatives = sorted(self._keyword_categories, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"\b(" + "|".join(map(re.escape, alternatives)) + r")(?:e?s)?\b"
+        ) if alternatives else None
+        self._order = {category: i for i, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ContentCategorizer":
+        """Load categories from a JSON object of {category: [keywords]}"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_env(cls) -> "ContentCategorizer":
+        """Use CONTENT_CATEGORIES_FILE when set, otherwise the built-in rules"""
+        path = os.getenv("CONTENT_CATEGORIES_FILE")
+        return cls.from_file(path) if path else cls()
+
+    def categorize(self, content: str) -> Tuple[List[str], List[str]]:
+        """Return (categories, keywords) for one message"""
+        lowered = content.lower()
+        found = set()
+        if self._pattern is not None:
+            for keyword in self._pattern.findall(lowered):
+                found.update(self._keyword_categories[keyword])
+        categories = sorted(found, key=self._order.__getitem__)
+
+        # Extract potential keywords (simple implementation)
+        keywords = [word for word in lowered.split() if len(word) > 4][:5]
+        return categories, keywords
+
+    def categorize_many(self, contents: Iterable[str]) -> List[Tuple[List[str], List[str]]]:
+        """Categorize a batch of messages"""
+        categorize = self.categorize
+        return [categorize(content) for content in contents]
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+
+
+class DatabaseUnavailable(psycopg2.OperationalError):
+    """Raised without touching the network while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops database calls from piling up behind connect timeouts.
+
+    After `failure_threshold` consecutive connection failures the circuit
+    opens and every call fails immediately with DatabaseUnavailable. A daemon
+    thread then runs `probe` every `probe_interval` seconds and closes the
+    circuit as soon as one succeeds, so no caller ever has to be the one
+    that waits on a dead server.
+    """
+
+    def __init__(self, probe: Callable[[], Any], failure_threshold: int = 3, probe_interval: float = 10.0):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trips = 0
+        self._prober: Optional[threading.Thread] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def check(self):
+        """Raise DatabaseUnavailable if calls should not be attempted"""
+        if self._opened_at is not None:
+            raise DatabaseUnavailable(
+                f"Database unavailable for {time.monotonic() - self._opened_at:.0f}s; reconnecting in the background"
+            )
+
+    def record_success(self):
+        self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures < self.failure_threshold:
+                return
+            self._opened_at = time.monotonic()
+            self._trips += 1
+            self._prober = threading.Thread(target=self._probe_until_closed, name="db-circuit-probe", daemon=True)
+            self._prober.start()
+        print(f"Database circuit opened after {self.failure_threshold} consecutive failures")
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"Database probe failed: {e}")
+                continue
+            with self._lock:
+                self._failures = 0
+                self._opened_at = None
+                self._prober = None
+            print("Database circuit closed, connection restored")
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        opened_at = self._opened_at
+        return {
+            "state": "open" if opened_at is not None else "closed",
+            "consecutive_failures": self._failures,
+            "open_seconds": time.monotonic() - opened_at if opened_at is not None else 0.0,
+            "trips": self._trips,
+        }
@@ -0,0 +1,131 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a character-based estimate
+    tiktoken = None
+
+# Tokens the chat format adds around every message, and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# Roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = " …"
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when it is installed, otherwise estimates from length"""
+
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Keep the start of `text` within `max_tokens`, marking the cut"""
+        if self.count(text) <= max_tokens:
+            return text
+        keep = max(max_tokens - self.count(TRUNCATION_MARK), 0)
+        if self.encoding is not None:
+            head = self.encoding.decode(self.encoding.encode(text)[:keep])
+        else:
+            head = text[:keep * CHARS_PER_TOKEN]
+        return head.rstrip() + TRUNCATION_MARK
+
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+@dataclass
+class ContextReport:
+    tokens: int
+    budget: int
+    turns_included: int
+    turns_dropped: int
+    turns_truncated: int
+    summary_tokens: int = 0
+
+
+class ContextBuilder:
+    """
+    Packs conversation history into a prompt token budget.
+
+    A rolling summary of older turns, when there is one, is placed first as
+    a system message cut to `max_summary_tokens`. Turns are then taken
+    newest first; each side of a turn is cut to `max_turn_tokens`, a turn
+    that no longer fits whole is truncated into the space that is left, and
+    once less than `min_turn_tokens` remain the older turns are dropped.
+    The result is replayed oldest first.
+    """
+
+    def __init__(self, budget: int = 3000, max_turn_tokens: int = 500, min_turn_tokens: int = 64,
+                 max_summary_tokens: int = 500, counter: TokenCounter = None):
+        self.budget = budget
+        self.max_turn_tokens = max_turn_tokens
+        self.min_turn_tokens = min_turn_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.counter = counter or TokenCounter()
+
+    @classmethod
+    def from_env(cls) -> "ContextBuilder":
+        return cls(
+            budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "3000")),
+            max_turn_tokens=int(os.getenv("CONTEXT_TURN_TOKEN_LIMIT", "500")),
+            max_summary_tokens=int(os.getenv("CONTEXT_SUMMARY_TOKEN_LIMIT", "500")),
+            counter=TokenCounter(os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")),
+        )
+
+    def _message_tokens(self, content: str) -> int:
+        return self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def build(self, turns_newest_first: Sequence[Tuple[str, str]], user_message: str,
+              summary: Optional[str] = None) -> Tuple[List[Dict[str, str]], ContextReport]:
+        """Chat messages for `user_message` preceded by as much history as fits"""
+        used = REPLY_PRIMING_TOKENS + self._message_tokens(user_message)
+        summary_message = None
+        summary_tokens = 0
+        if summary:
+            summary_message = SUMMARY_PREFIX + self.counter.truncate(summary, self.max_summary_tokens)
+            summary_tokens = self._message_tokens(summary_message)
+            used += summary_tokens
+        packed = []
+        truncated = 0
+        for message, response in turns_newest_first:
+            remaining = self.budget - used - 2 * MESSAGE_OVERHEAD_TOKENS
+            if remaining < self.min_turn_tokens:
+                break
+            message_budget = min(self.max_turn_tokens, remaining // 2)
+            fitted_message = self.counter.truncate(message, message_budget)
+            response_budget = min(self.max_turn_tokens, remaining - self.counter.count(fitted_message))
+            fitted_response = self.counter.truncate(response, response_budget)
+            truncated += (fitted_message, fitted_response) != (message, response)
+            used += self._message_tokens(fitted_message) + self._message_tokens(fitted_response)
+            packed.append((fitted_message, fitted_response))
+
+        messages = []
+        if summary_message:
+            messages.append({"role": "system", "content": summary_message})
+        for message, response in reversed(packed):
+            messages.extend([
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": response}
+            ])
+        messages.append({"role": "user", "content": user_message})
+        return messages, ContextReport(
+            tokens=used,
+            budget=self.budget,
+            turns_included=len(packed),
+            turns_dropped=len(turns_newest_first) - len(packed),
+            turns_truncated=truncated,
+            summary_tokens=summary_tokens,
+        )
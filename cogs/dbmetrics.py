@@ -0,0 +1,147 @@
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from psycopg2.extensions import cursor as pg_cursor
+
+# Bucket upper bounds grow by 2^(1/4) (~19%) from 0.1 ms to ~105 s; slower calls land in a final overflow bucket
+BUCKETS_PER_DOUBLING = 4
+BUCKET_BOUNDS = [0.0001 * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(20 * BUCKETS_PER_DOUBLING + 1)]
+
+# Rows and pool wait of the call running on this thread
+_current = threading.local()
+
+
+def note_rows(count: int):
+    if count > 0:
+        _current.rows = getattr(_current, "rows", 0) + count
+
+
+def note_pool_wait(seconds: float):
+    _current.pool_wait = getattr(_current, "pool_wait", 0.0) + seconds
+
+
+class CountingCursor(pg_cursor):
+    """
+    Cursor that adds the rows each statement returned or affected to the
+    running call's row count. Named cursors report rows only as they are
+    fetched, so streamed reads are not counted.
+    """
+    def execute(self, query, vars=None):
+        result = super().execute(query, vars)
+        note_rows(self.rowcount)
+        return result
+
+    def executemany(self, query, vars_list):
+        result = super().executemany(query, vars_list)
+        note_rows(self.rowcount)
+        return result
+
+
+class LatencyHistogram:
+    """Fixed log-scale buckets: constant memory, percentiles at most ~19% above the true value"""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += 1
+
+    def percentile(self, percentile: float) -> float:
+        """Upper bound in seconds of the bucket holding the percentile, 0.0 when empty"""
+        if not self.total:
+            return 0.0
+        threshold = self.total * percentile / 100
+        running = 0
+        for i, count in enumerate(self.counts):
+            running += count
+            if running >= threshold:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+
+class MethodStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+class QueryMetrics:
+    """
+    Per-method latency histograms, row counts, error counts and pool wait
+    for BotDatabase. Methods are timed on the thread that runs them, so
+    executor queueing is not included.
+    """
+    def __init__(self):
+        self._methods: Dict[str, MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def timed(self, name: str, func: Callable) -> Callable:
+        """Wrap `func` so every call is recorded under `name`"""
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            outer = getattr(_current, "active", False)
+            if outer:
+                # Nested calls are part of the outer method's measurement
+                return func(*args, **kwargs)
+            _current.active = True
+            _current.rows = 0
+            _current.pool_wait = 0.0
+            _current.failed = False
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                _current.failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                _current.active = False
+                self.record(name, elapsed, _current.rows, _current.pool_wait, _current.failed)
+        return call
+
+    def note_error(self):
+        """Count the running call as failed even though it handled its exception"""
+        _current.failed = True
+
+    def record(self, name: str, seconds: float, rows: int = 0, pool_wait: float = 0.0, failed: bool = False):
+        with self._lock:
+            stats = self._methods.get(name)
+            if stats is None:
+                stats = self._methods[name] = MethodStats()
+            stats.latency.record(seconds)
+            stats.calls += 1
+            stats.errors += failed
+            stats.rows += rows
+            stats.total_seconds += seconds
+            stats.pool_wait_seconds += pool_wait
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """One entry per method, most total time first"""
+        with self._lock:
+            rows = [
+                {
+                    "method": name,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "rows": stats.rows,
+                    "total_seconds": stats.total_seconds,
+                    "avg_pool_wait": stats.pool_wait_seconds / stats.calls,
+                    "p50": stats.latency.percentile(50),
+                    "p95": stats.latency.percentile(95),
+                    "p99": stats.latency.percentile(99),
+                }
+                for name, stats in self._methods.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
@@ -0,0 +1,190 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from cogs.dbmetrics import note_pool_wait
+
+
+# SQLSTATE classes meaning the connection itself is gone:
+# 08 connection exceptions, 57P01-57P03 server shutting down or not accepting connections
+CONNECTION_LOST_SQLSTATES = ("08", "57P01", "57P02", "57P03")
+
+
+class PoolTimeout(pg_pool.PoolError):
+    """Raised when no pooled connection becomes available in time"""
+
+
+def is_connection_lost(exc: BaseException, conn=None) -> bool:
+    """
+    True when `exc` means the connection is unusable, rather than a server-side
+    error like a deadlock, lock timeout or full disk on a healthy connection.
+    libpq's own connect and socket failures are raised as plain OperationalError
+    without a SQLSTATE; server errors come as subclasses carrying one.
+    """
+    if isinstance(exc, psycopg2.InterfaceError) or (conn is not None and conn.closed):
+        return True
+    if not isinstance(exc, psycopg2.OperationalError):
+        return False
+    pgcode = getattr(exc, "pgcode", None)
+    if pgcode is None:
+        return type(exc) is psycopg2.OperationalError
+    return pgcode.startswith(CONNECTION_LOST_SQLSTATES)
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of psycopg2 connections.
+
+    Wraps psycopg2's ThreadedConnectionPool with a semaphore so callers wait
+    for a free connection instead of failing when the pool is exhausted,
+    checks idle connections before handing them out and keeps usage counters.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], minconn: int = 1, maxconn: int = 10,
+                 health_check_interval: float = 30.0, acquire_timeout: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: min={minconn}, max={maxconn}")
+        self.connection_params = connection_params
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._returned_at: Dict[int, float] = {}
+        self._in_use = 0
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+        }
+
+    def _get_pool(self):
+        # Created lazily so importing the bot never needs a reachable database
+        with self._lock:
+            if self._pool is None:
+                self._pool = pg_pool.ThreadedConnectionPool(
+                    self.minconn, self.maxconn, **self.connection_params
+                )
+            return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        returned_at = self._returned_at.get(id(conn))
+        # Freshly opened connections and recently used ones skip the round trip
+        if returned_at is None or time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self, timeout: float = None):
+        """Check a connection out of the pool, waiting up to `timeout` seconds"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(blocking=False):
+            started = time.monotonic()
+            acquired = self._slots.acquire(timeout=timeout)
+            waited = time.monotonic() - started
+            note_pool_wait(waited)
+            with self._lock:
+                self._counters["waits"] += 1
+                self._counters["wait_seconds"] += waited
+                if not acquired:
+                    self._counters["timeouts"] += 1
+            if not acquired:
+                raise PoolTimeout(f"No database connection available after {timeout}s")
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                with self._lock:
+                    self._counters["health_check_failures"] += 1
+                self._discard(pool, conn)
+                conn = pool.getconn()
+        except psycopg2.Error as e:
+            print(f"Database connection error: {e}")
+            self._slots.release()
+            raise
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._counters["checkouts"] += 1
+        return conn
+
+    def _discard(self, pool, conn):
+        self._returned_at.pop(id(conn), None)
+        with self._lock:
+            self._counters["discarded"] += 1
+        pool.putconn(conn, close=True)
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it if it is broken"""
+        pool = self._get_pool()
+        try:
+            if discard or conn.closed:
+                self._discard(pool, conn)
+            else:
+                self._returned_at[id(conn)] = time.monotonic()
+                pool.putconn(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for one unit of work.
+        Commits when the block succeeds, rolls back when it raises.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            # Server-side errors leave a healthy connection that only needs a rollback
+            discard = is_connection_lost(e, conn)
+            if not discard:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage"""
+        with self._lock:
+            idle = len(self._pool._pool) if self._pool is not None else 0
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self._in_use,
+                "idle": idle,
+                "open": self._in_use + idle,
+                **self._counters,
+            }
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._returned_at.clear()
@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+# Rough per-turn bookkeeping cost on top of the text itself
+TURN_OVERHEAD_BYTES = 120
+
+
+class ConversationCache:
+    """
+    Hot tier in front of gpt_conversation_history.
+
+    Holds a ring buffer of the most recent turns for each (user, channel),
+    with their timestamps so reads can apply the same lookback bound as the
+    database query. Whole keys are evicted least-recently-used first once
+    the cached text exceeds `max_bytes`. Safe to use from the database
+    executor threads.
+    """
+
+    def __init__(self, turns_per_key: int = 20, max_bytes: int = 32 * 1024 * 1024):
+        self.turns_per_key = turns_per_key
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, int], deque]" = OrderedDict()
+        self._sizes: Dict[Tuple[int, int], int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _turn_size(message: str, response: str, timestamp: datetime = None) -> int:
+        return len(message or "") + len(response or "") + TURN_OVERHEAD_BYTES
+
+    def get(self, user_id: int, channel_id: int, limit: int, since: datetime = None,
+            after: datetime = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        Newest-first turns like the database query, or None on a miss.
+        `since` is inclusive and `after` exclusive, as in the query. A limit
+        beyond the ring is still served when the ring provably holds every
+        turn after `after`.
+        """
+        key = (user_id, channel_id)
+        with self._lock:
+            turns = self._entries.get(key)
+            if turns is None or (limit > self.turns_per_key and not self._reaches(turns, after)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [
+                (message, response) for message, response, timestamp in reversed(turns)
+                if timestamp is None or ((since is None or timestamp >= since) and (after is None or timestamp > after))
+            ][:limit]
+
+    @staticmethod
+    def _reaches(turns: deque, after: Optional[datetime]) -> bool:
+        # A ring that never filled up holds the whole history it was loaded with
+        if len(turns) < turns.maxlen:
+            return True
+        oldest = turns[0][2]
+        return after is not None and oldest is not None and oldest <= after
+
+    def load(self, user_id: int, channel_id: int, turns_newest_first: List[tuple]):
+        """Populate a key from a database read of (message, response[, timestamp]) rows"""
+        key = (user_id, channel_id)
+        turns = deque(
+            ((turn[0], turn[1], turn[2] if len(turn) > 2 else None)
+             for turn in reversed(turns_newest_first[:self.turns_per_key])),
+            maxlen=self.turns_per_key
+        )
+        size = sum(self._turn_size(*turn) for turn in turns)
+        with self._lock:
+            self._total_bytes -= self._sizes.get(key, 0)
+            self._entries[key] = turns
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def append(self, user_id: int, channel_id: int, message: str, response: str, timestamp: datetime = None):
+        """
+        Write-through for a new turn. Keys that are not cached are left alone,
+        the next read loads them from the database in full.
+        """
+        key = (user_id, channel_id)
+        with self._lock:
+            turns = self._entries.get(key)
+            if turns is None:
+                return
+            if len(turns) == turns.maxlen:
+                dropped = self._turn_size(*turns[0])
+                self._sizes[key] -= dropped
+                self._total_bytes -= dropped
+            turns.append((message, response, timestamp or datetime.now()))
+            added = self._turn_size(message, response)
+            self._sizes[key] += added
+            self._total_bytes += added
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, user_id: int, channel_id: int):
+        key = (user_id, channel_id)
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._total_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "keys": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+# Statuses worth retrying: rate limiting and transient server-side failures
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The chat completion request failed"""
+
+
+class LLMAuthenticationError(LLMError):
+    """The API key was rejected"""
+
+
+class LLMRateLimitError(LLMError):
+    """Still rate limited after every retry"""
+
+
+class LLMClient:
+    """
+    Async client for OpenAI-compatible chat completions.
+
+    One aiohttp session with a keep-alive connection pool is shared by every
+    mention, at most `max_concurrency` requests are in flight at once, and
+    rate limits, timeouts and 5xx responses are retried with exponential
+    backoff. `base_url` can point at any compatible server, e.g. a local
+    stand-in for load tests.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: str = "https://api.openai.com/v1",
+                 model: str = "gpt-3.5-turbo", max_concurrency: int = 8, timeout: float = 60.0,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created on first use so it binds to the bot's running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * 2 ** attempt * (1 + random.random() / 2)
+
+    async def _should_retry(self, response: aiohttp.ClientResponse, attempt: int) -> bool:
+        """Back off and return True for a retryable status; raise for any other error"""
+        if response.status == 401:
+            raise LLMAuthenticationError("The API key was rejected")
+        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+            delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+            response.release()
+            await asyncio.sleep(delay)
+            return True
+        if response.status == 429:
+            raise LLMRateLimitError("Rate limit exceeded")
+        if response.status >= 400:
+            raise LLMError(f"HTTP {response.status}: {(await response.text())[:200]}")
+        return False
+
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> str:
+        """Return the reply text for `messages`; extra params go into the request body"""
+        body = {"model": self.model, "messages": messages, **params}
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._get_session().post(f"{self.base_url}/chat/completions", json=body) as response:
+                        if await self._should_retry(response, attempt):
+                            continue
+                        data = await response.json()
+                        return data["choices"][0]["message"]["content"].strip()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        raise LLMError(f"Request failed after {self.max_retries + 1} attempts: {e!r}") from e
+                    await asyncio.sleep(self._retry_delay(attempt))
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """
+        Yield the reply text piece by piece as the server streams it.
+        Failures are retried only until the first piece has been yielded;
+        the timeout then applies to each read instead of the whole reply.
+        """
+        body = {"model": self.model, "messages": messages, **params, "stream": True}
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout.total, sock_read=self.timeout.total)
+        started = False
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._get_session().post(
+                        f"{self.base_url}/chat/completions", json=body, timeout=timeout
+                    ) as response:
+                        if await self._should_retry(response, attempt):
+                            continue
+                        # Server-sent events: one "data: {json}" line per chunk, then "data: [DONE]"
+                        async for line in response.content:
+                            line = line.strip()
+                            if not line.startswith(b"data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == b"[DONE]":
+                                return
+                            choices = json.loads(data).get("choices") or [{}]
+                            piece = (choices[0].get("delta") or {}).get("content")
+                            if piece:
+                                started = True
+                                yield piece
+                        return
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if started or attempt == self.max_retries:
+                        raise LLMError(f"Streaming request failed: {e!r}") from e
+                    await asyncio.sleep(self._retry_delay(attempt))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,427 @@
+"""
+Versioned schema migrations for the bot database.
+
+Each entry in MIGRATIONS is (version, description, statements). Pending
+migrations run once at startup inside a single transaction and the applied
+version is recorded in schema_migrations, so request handlers never issue DDL.
+Never edit a migration that has shipped; append a new one instead.
+"""
+from typing import List, Tuple
+
+# Arbitrary key for pg_advisory_xact_lock so two bot processes never migrate at once
+MIGRATION_LOCK_ID = 7_341_002
+
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS user_activities (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT,
+            command TEXT,
+            timestamp TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS conversation_memory (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT,
+            context TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_points (
+            user_id BIGINT PRIMARY KEY,
+            activity_points INTEGER DEFAULT 0,
+            helpful_reactions INTEGER DEFAULT 0,
+            streak_days INTEGER DEFAULT 0,
+            last_active DATE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS smart_reminders (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT,
+            reminder_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scheduled_for TIMESTAMP,
+            context TEXT,
+            status TEXT DEFAULT 'pending'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS content_categories (
+            id SERIAL PRIMARY KEY,
+            content TEXT,
+            categories JSONB,
+            keywords TEXT[],
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS gpt_conversation_history (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT,
+            channel_id BIGINT,
+            message TEXT,
+            bot_response TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            context_used TEXT[]
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id SERIAL PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 10),
+            feedback_text TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # Text columns are deliberately left out of INCLUDE: a long bot_response
+    # would exceed the btree tuple limit and reject the insert.
+    (2, "Per-user lookup indexes", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_gpt_history_user_channel_ts
+        ON gpt_conversation_history (user_id, channel_id, timestamp DESC)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_activities_user_ts
+        ON user_activities (user_id, timestamp)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_conversation_memory_user_ts
+        ON conversation_memory (user_id, timestamp DESC)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_smart_reminders_user_scheduled
+        ON smart_reminders (user_id, scheduled_for)
+        """,
+    ]),
+    # context_used repeated the full text of every prior turn on each row.
+    # Contexts are now stored once per conversation and referenced by md5
+    # digest; Python's hashlib.md5 over UTF-8 matches Postgres md5().
+    (3, "Content-addressed conversation context", [
+        """
+        CREATE TABLE IF NOT EXISTS conversation_context (
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            digest CHAR(32) NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (user_id, channel_id, digest)
+        )
+        """,
+        """
+        ALTER TABLE gpt_conversation_history ADD COLUMN IF NOT EXISTS context_digests TEXT[]
+        """,
+        """
+        INSERT INTO conversation_context (user_id, channel_id, digest, content)
+        SELECT DISTINCT h.user_id, h.channel_id, md5(c.content), c.content
+        FROM gpt_conversation_history h, unnest(h.context_used) AS c(content)
+        WHERE h.context_used IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        UPDATE gpt_conversation_history
+        SET context_digests = ARRAY(
+            SELECT md5(u.content)
+            FROM unnest(context_used) WITH ORDINALITY AS u(content, ord)
+            ORDER BY u.ord
+        )
+        WHERE context_used IS NOT NULL
+        """,
+        """
+        ALTER TABLE gpt_conversation_history DROP COLUMN IF EXISTS context_used
+        """,
+    ]),
+    (4, "Stored, indexed leaderboard score", [
+        """
+        ALTER TABLE user_points ADD COLUMN IF NOT EXISTS total_score NUMERIC
+        GENERATED ALWAYS AS (
+            COALESCE(activity_points, 0) * 0.4
+            + COALESCE(helpful_reactions, 0) * 0.4
+            + COALESCE(streak_days, 0) * 0.2
+        ) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_points_score
+        ON user_points (total_score DESC, user_id)
+        """,
+    ]),
+    (5, "Activity rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS user_activity_hourly (
+            user_id BIGINT NOT NULL,
+            hour SMALLINT NOT NULL CHECK (hour BETWEEN 0 AND 23),
+            activity_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, hour)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_command_counts (
+            user_id BIGINT NOT NULL,
+            command TEXT NOT NULL,
+            usage_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, command)
+        )
+        """,
+        """
+        INSERT INTO user_activity_hourly (user_id, hour, activity_count)
+        SELECT user_id, EXTRACT(HOUR FROM timestamp)::SMALLINT, COUNT(*)
+        FROM user_activities
+        WHERE user_id IS NOT NULL AND timestamp IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        INSERT INTO user_command_counts (user_id, command, usage_count)
+        SELECT user_id, command, COUNT(*)
+        FROM user_activities
+        WHERE user_id IS NOT NULL AND command IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+        """,
+    ]),
+    (6, "Pending reminder index", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_smart_reminders_pending_due
+        ON smart_reminders (scheduled_for)
+        WHERE status = 'pending'
+        """,
+    ]),
+    # conversation_memory becomes a fixed ring of slots per user, written with
+    # slot = seq % max_memory. The newest 10 entries (the default max_memory)
+    # are kept, oldest in slot 0, and seq points at the newest.
+    (7, "Ring-buffer context memory", [
+        """
+        CREATE TABLE context_memory_seq (
+            user_id BIGINT PRIMARY KEY,
+            seq BIGINT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE context_memory_ring (
+            user_id BIGINT NOT NULL,
+            slot SMALLINT NOT NULL,
+            context TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, slot)
+        )
+        """,
+        """
+        INSERT INTO context_memory_ring (user_id, slot, context, timestamp)
+        SELECT user_id, (kept - rn)::SMALLINT, context, COALESCE(timestamp, CURRENT_TIMESTAMP)
+        FROM (
+            SELECT user_id, context, timestamp,
+                   row_number() OVER (PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS rn,
+                   LEAST(COUNT(*) OVER (PARTITION BY user_id), 10) AS kept
+            FROM conversation_memory
+            WHERE user_id IS NOT NULL AND context IS NOT NULL
+        ) ranked
+        WHERE rn <= 10
+        """,
+        """
+        INSERT INTO context_memory_seq (user_id, seq)
+        SELECT user_id, MAX(slot) FROM context_memory_ring GROUP BY user_id
+        """,
+        """
+        DROP TABLE conversation_memory
+        """,
+        """
+        ALTER TABLE context_memory_ring RENAME TO conversation_memory
+        """,
+    ]),
+    (8, "Full-text search", [
+        """
+        ALTER TABLE gpt_conversation_history ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('english', COALESCE(message, '') || ' ' || COALESCE(bot_response, ''))
+        ) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_gpt_history_search
+        ON gpt_conversation_history USING GIN (search_vector)
+        """,
+        """
+        ALTER TABLE content_categories ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', COALESCE(content, ''))) STORED
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_content_categories_search
+        ON content_categories USING GIN (search_vector)
+        """,
+    ]),
+    (9, "Running feedback aggregate", [
+        """
+        CREATE TABLE IF NOT EXISTS feedback_stats (
+            id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            rating_count BIGINT NOT NULL DEFAULT 0,
+            rating_sum BIGINT NOT NULL DEFAULT 0,
+            histogram BIGINT[] NOT NULL DEFAULT array_fill(0::BIGINT, ARRAY[10])
+        )
+        """,
+        """
+        INSERT INTO feedback_stats (id, rating_count, rating_sum, histogram)
+        SELECT 1, COUNT(*), COALESCE(SUM(rating), 0), ARRAY(
+            SELECT COUNT(f.rating)
+            FROM generate_series(1, 10) AS r(rating)
+            LEFT JOIN feedback f ON f.rating = r.rating
+            GROUP BY r.rating
+            ORDER BY r.rating
+        )
+        FROM feedback
+        ON CONFLICT (id) DO NOTHING
+        """,
+    ]),
+    # gpt_conversation_history becomes a table range-partitioned by month so
+    # retention can drop whole partitions. The primary key has to include the
+    # partition key, and timestamp becomes NOT NULL. Partitions are created
+    # for every month of existing data through two months ahead; later ones
+    # come from BotDatabase.maintain_conversation_partitions.
+    (10, "Monthly partitioned conversation history", [
+        """
+        ALTER TABLE gpt_conversation_history RENAME TO gpt_conversation_history_unpartitioned
+        """,
+        """
+        ALTER TABLE gpt_conversation_history_unpartitioned DROP CONSTRAINT gpt_conversation_history_pkey
+        """,
+        """
+        DROP INDEX IF EXISTS idx_gpt_history_user_channel_ts
+        """,
+        """
+        DROP INDEX IF EXISTS idx_gpt_history_search
+        """,
+        """
+        ALTER SEQUENCE gpt_conversation_history_id_seq OWNED BY NONE
+        """,
+        """
+        CREATE TABLE gpt_conversation_history (
+            id INTEGER NOT NULL DEFAULT nextval('gpt_conversation_history_id_seq'),
+            user_id BIGINT,
+            channel_id BIGINT,
+            message TEXT,
+            bot_response TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            context_digests TEXT[],
+            search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('english', COALESCE(message, '') || ' ' || COALESCE(bot_response, ''))
+            ) STORED,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """,
+        """
+        ALTER SEQUENCE gpt_conversation_history_id_seq OWNED BY gpt_conversation_history.id
+        """,
+        """
+        DO $$
+        DECLARE
+            first_month DATE;
+            last_month DATE;
+        BEGIN
+            SELECT date_trunc('month', COALESCE(MIN(timestamp), CURRENT_TIMESTAMP))::date,
+                   date_trunc('month', GREATEST(COALESCE(MAX(timestamp), CURRENT_TIMESTAMP),
+                                                CURRENT_TIMESTAMP + INTERVAL '2 months'))::date
+            INTO first_month, last_month
+            FROM gpt_conversation_history_unpartitioned;
+
+            WHILE first_month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF gpt_conversation_history FOR VALUES FROM (%L) TO (%L)',
+                    'gpt_conversation_history_p' || to_char(first_month, 'YYYYMM'),
+                    first_month, (first_month + INTERVAL '1 month')::date
+                );
+                first_month := (first_month + INTERVAL '1 month')::date;
+            END LOOP;
+        END
+        $$
+        """,
+        """
+        CREATE INDEX idx_gpt_history_user_channel_ts
+        ON gpt_conversation_history (user_id, channel_id, timestamp DESC)
+        """,
+        """
+        CREATE INDEX idx_gpt_history_search
+        ON gpt_conversation_history USING GIN (search_vector)
+        """,
+        """
+        INSERT INTO gpt_conversation_history
+        (id, user_id, channel_id, message, bot_response, timestamp, context_digests)
+        SELECT id, user_id, channel_id, message, bot_response,
+               COALESCE(timestamp, CURRENT_TIMESTAMP), context_digests
+        FROM gpt_conversation_history_unpartitioned
+        """,
+        """
+        DROP TABLE gpt_conversation_history_unpartitioned
+        """,
+    ]),
+    (11, "Rolling conversation summaries", [
+        # One row per (user, channel): everything up to (covered_until, covered_id) folded into summary
+        """
+        CREATE TABLE conversation_summaries (
+            user_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            summary TEXT NOT NULL,
+            turns_covered INTEGER NOT NULL,
+            covered_until TIMESTAMP NOT NULL,
+            covered_id INTEGER NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, channel_id)
+        )
+        """,
+    ]),
+    (12, "Per-guild response cache opt-out", [
+        """
+        CREATE TABLE response_cache_opt_outs (
+            guild_id BIGINT PRIMARY KEY,
+            opted_out_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (13, "Scope categorized content to its guild and author", [
+        # Existing rows have no owner and stop showing up in searches
+        """
+        ALTER TABLE content_categories
+            ADD COLUMN IF NOT EXISTS guild_id BIGINT,
+            ADD COLUMN IF NOT EXISTS user_id BIGINT
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_content_categories_owner
+        ON content_categories (guild_id, user_id)
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(conn) -> int:
+    """
+    Apply every migration newer than the recorded schema version.
+    The caller owns the transaction; returns the resulting schema version.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        current = cur.fetchone()[0]
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            current = version
+            print(f"Applied database migration {version}: {description}")
+
+        return current
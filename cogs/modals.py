@@ -3,9 +3,9 @@ from discord.ext import commands
 from discord import ui
 import json
 import datetime
-from cogs.botDBMS import BotDatabase
+from cogs.botDBMS import get_async_database
 
-db=BotDatabase()
+db=get_async_database()
 
 class FeedbackModal(ui.Modal, title='Feedback Form'):
     rating = ui.TextInput(
@@ -28,7 +28,7 @@ class FeedbackModal(ui.Modal, title='Feedback Form'):
             if not 1 <= rating_value <= 10:
                 raise ValueError()
 
-            success = db.save_feedback(
+            success = await db.save_feedback(
                 user=interaction.user, 
                 rating=rating_value, 
                 feedback=self.feedback.value
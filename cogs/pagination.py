@@ -0,0 +1,74 @@
+import discord
+from discord import ui
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+# fetch_page(cursor) -> (items, next_cursor); next_cursor is None on the last page
+FetchPage = Callable[[Optional[Any]], Awaitable[Tuple[List[Any], Optional[Any]]]]
+RenderPage = Callable[[List[Any], int], discord.Embed]
+
+class KeysetPaginator(ui.View):
+    """
+    Previous/Next buttons over a keyset-paginated query.
+    Pages are fetched on demand from the cursor of the page before them, so
+    only the pages a user actually opens are ever read or held in memory.
+    """
+    def __init__(self, author_id: int, fetch_page: FetchPage, render: RenderPage, timeout: float = 120):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.fetch_page = fetch_page
+        self.render = render
+        self.pages: List[Tuple[List[Any], Optional[Any]]] = []
+        self.index = 0
+        self.message = None
+
+    async def start(self, ctx) -> bool:
+        """Send the first page; returns False when there is nothing to show"""
+        items, cursor = await self.fetch_page(None)
+        if not items:
+            return False
+        self.pages.append((items, cursor))
+        self._update_buttons()
+        self.message = await ctx.send(embed=self.render(items, 1), view=self)
+        return True
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index == len(self.pages) - 1 and self.pages[-1][1] is None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the person who ran the command can page through these results.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        self._update_buttons()
+        items, _ = self.pages[self.index]
+        await interaction.response.edit_message(embed=self.render(items, self.index + 1), view=self)
+
+    @ui.button(label="◀ Previous", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        self.index = max(self.index - 1, 0)
+        await self._show(interaction)
+
+    @ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        if self.index == len(self.pages) - 1:
+            items, cursor = await self.fetch_page(self.pages[-1][1])
+            if not items:
+                # The previous page happened to end exactly at the last row
+                self.pages[-1] = (self.pages[-1][0], None)
+                await self._show(interaction)
+                return
+            self.pages.append((items, cursor))
+        self.index += 1
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
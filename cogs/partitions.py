@@ -0,0 +1,76 @@
+"""
+Monthly range partitions for gpt_conversation_history.
+
+Each partition is named gpt_conversation_history_pYYYYMM and holds the rows
+whose timestamp falls in [first of that month, first of the next month).
+Retention is enforced by dropping whole partitions, never by row DELETEs.
+"""
+from datetime import date, datetime
+from typing import List, Union
+
+from psycopg2 import sql
+
+PARTITIONED_TABLE = "gpt_conversation_history"
+# Partitions are created this many months ahead so inserts never lack a target
+MONTHS_AHEAD = 2
+
+
+def month_start(day: Union[date, datetime]) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name: str):
+    """Month covered by a partition created here, or None for any other table"""
+    prefix = f"{PARTITIONED_TABLE}_p"
+    suffix = name[len(prefix):]
+    if not name.startswith(prefix) or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def ensure_partitions(cur, start: date, months: int) -> List[str]:
+    """Create the partitions for `months` months from `start` that do not exist yet"""
+    created = []
+    existing = set(list_partitions(cur))
+    month = month_start(start)
+    for _ in range(months):
+        name = partition_name(month)
+        if name not in existing:
+            cur.execute(sql.SQL(
+                "CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)"
+            ).format(sql.Identifier(name), sql.Identifier(PARTITIONED_TABLE)),
+                (month, add_months(month, 1)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions_before(cur, cutoff: date) -> List[str]:
+    """Drop every partition that ends on or before `cutoff`"""
+    dropped = []
+    for name in list_partitions(cur):
+        month = partition_month(name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            dropped.append(name)
+    return dropped
+
+
+def list_partitions(cur) -> List[str]:
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (PARTITIONED_TABLE,))
+    return [row[0] for row in cur.fetchall()]
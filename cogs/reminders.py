@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+from cogs.botDBMS import get_async_database
+
+class ReminderScheduler(commands.Cog):
+    """
+    Delivers smart reminders from one background task.
+
+    Pending reminders due within `horizon` are loaded into a min-heap keyed by
+    due time; the task sleeps until the earliest one (or the next horizon
+    reload) and is woken early when !set_reminder adds something sooner.
+    Delivered reminders are marked in one UPDATE per wake-up; marks that fail
+    are kept and retried before anything new is sent. Each reload only
+    reads the next slice of time through the pending-reminders index, so a
+    restart never rescans the whole table.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.db = get_async_database()
+        self.horizon = timedelta(minutes=float(os.getenv("REMINDER_HORIZON_MINUTES", "60")))
+        self._heap: List[tuple] = []
+        self._queued_ids = set()
+        self._unmarked: Dict[str, List[int]] = {'sent': [], 'failed': []}
+        self._loaded_until: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def cog_load(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def cog_unload(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def schedule(self, reminder_id: int, user_id: int, text: str, due: datetime):
+        """Queue a reminder if it falls inside the window that has already been loaded"""
+        if reminder_id in self._queued_ids:
+            return
+        if self._loaded_until is not None and due > self._loaded_until:
+            return  # The next horizon reload will pick it up
+        heapq.heappush(self._heap, (due, reminder_id, user_id, text))
+        self._queued_ids.add(reminder_id)
+        self._wakeup.set()
+
+    @commands.Cog.listener()
+    async def on_reminder_created(self, reminder: Dict[str, Any]):
+        self.schedule(reminder['reminder_id'], reminder['user_id'], reminder['text'], reminder['scheduled_for'])
+
+    async def load_window(self, now: datetime):
+        """Load pending reminders up to now + horizon that are not queued yet"""
+        until = now + self.horizon
+        rows = await self.db.get_pending_reminders(self._loaded_until, until)
+        self._loaded_until = until
+        for reminder_id, user_id, text, due in rows:
+            self.schedule(reminder_id, user_id, text, due)
+
+    async def deliver_due(self, now: datetime) -> int:
+        """Send every reminder that is due and record the outcome in one batch per status"""
+        # Reminders already sent but not marked yet would be sent again after a restart
+        await self.mark_delivered()
+        sent, failed = self._unmarked['sent'], self._unmarked['failed']
+        delivered = 0
+        while self._heap and self._heap[0][0] <= now:
+            due, reminder_id, user_id, text = heapq.heappop(self._heap)
+            self._queued_ids.discard(reminder_id)
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                embed = discord.Embed(title="⏰ Reminder", description=text, color=discord.Color.blue())
+                embed.set_footer(text=f"Scheduled for {due.strftime('%Y-%m-%d %H:%M')}")
+                await user.send(embed=embed)
+                sent.append(reminder_id)
+                delivered += 1
+            except Exception as e:
+                print(f"Error delivering reminder {reminder_id}: {e}")
+                failed.append(reminder_id)
+
+        await self.mark_delivered()
+        return delivered
+
+    async def mark_delivered(self):
+        """Record the outcome of delivered reminders; ids stay queued for the next try if this fails"""
+        for status, reminder_ids in self._unmarked.items():
+            if reminder_ids:
+                await self.db.mark_reminders(list(reminder_ids), status)
+                reminder_ids.clear()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                now = datetime.now()
+                if self._loaded_until is None or now >= self._loaded_until:
+                    await self.load_window(now)
+                await self.deliver_due(now)
+
+                wake_at = self._loaded_until
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                delay = max((wake_at - datetime.now()).total_seconds(), 0)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in reminder scheduler: {e}")
+                await asyncio.sleep(30)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ReminderScheduler(bot))
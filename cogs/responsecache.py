@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Discord user, role and channel mentions, e.g. <@123>, <@!123>, <@&123>, <#123>
+MENTION_PATTERN = re.compile(r"<(?:@[!&]?|#)\d+>")
+TRAILING_PUNCTUATION = " \t\n.!?,;:"
+
+
+def normalize_prompt(text: str) -> str:
+    """Fold away the differences that do not change the question: mentions, case, spacing, end punctuation"""
+    text = MENTION_PATTERN.sub(" ", text or "")
+    return " ".join(text.lower().split()).strip(TRAILING_PUNCTUATION)
+
+
+def context_fingerprint(context: List[Dict[str, str]], **params: Any) -> str:
+    """Digest of everything besides the prompt that shapes the reply"""
+    payload = json.dumps([context, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Replies to repeated prompts, so near-identical mentions skip the API.
+
+    Entries are keyed on the normalized prompt plus a fingerprint of the
+    context sent with it, expire `ttl` seconds after they were stored and
+    are evicted least-recently-used first beyond `max_entries`. Guilds in
+    `disabled_guilds` neither read nor fill the cache. Only used from the
+    event loop, so no locking.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.disabled_guilds = set()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+        )
+
+    @staticmethod
+    def key(prompt: str, context: List[Dict[str, str]], **params: Any) -> Tuple[str, str]:
+        return normalize_prompt(prompt), context_fingerprint(context, **params)
+
+    def enabled_for(self, guild_id: Optional[int]) -> bool:
+        return self.max_entries > 0 and guild_id not in self.disabled_guilds
+
+    def set_enabled(self, guild_id: int, enabled: bool):
+        if enabled:
+            self.disabled_guilds.discard(guild_id)
+        else:
+            self.disabled_guilds.add(guild_id)
+
+    def load_opt_outs(self, guild_ids: Iterable[int]):
+        self.disabled_guilds.update(guild_ids)
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry[0] >= self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Tuple[str, str], reply: str):
+        if self.max_entries <= 0 or not key[0]:
+            return
+        self._entries[key] = (self.clock(), reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
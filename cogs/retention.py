@@ -0,0 +1,33 @@
+from discord.ext import commands, tasks
+from cogs.botDBMS import get_async_database
+
+class HistoryRetention(commands.Cog):
+    """
+    Keeps the monthly conversation history partitions in shape: upcoming
+    months are created ahead of time and, with CONVERSATION_RETENTION_MONTHS
+    set, expired months are dropped as whole partitions.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.db = get_async_database()
+        self.maintain_partitions.start()
+
+    async def cog_unload(self):
+        self.maintain_partitions.cancel()
+
+    @tasks.loop(hours=24.0)
+    async def maintain_partitions(self):
+        try:
+            result = await self.db.maintain_conversation_partitions()
+        except Exception as e:
+            print(f"Error maintaining conversation partitions: {e}")
+            return
+        for name in result["created"]:
+            print(f"Created conversation history partition {name}")
+        for name in result["dropped"]:
+            print(f"Dropped expired conversation history partition {name}")
+        if result.get("deleted_rows"):
+            print(f"Deleted {result['deleted_rows']} expired conversation turns")
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(HistoryRetention(bot))
@@ -0,0 +1,517 @@
+"""
+Embedded SQLite backend for BotDatabase.
+
+Select it with DATABASE_BACKEND=sqlite. Every BotDatabase method works
+against a single local file, so small deployments need no server and tests
+and benchmarks can run the real query paths on one machine.
+
+Queries shared with the Postgres backend run unchanged: cursors translate
+the %s placeholders to SQLite's ?, datetimes are stored as ISO text and read
+back through the TIMESTAMP converter, and lists are stored as JSON. Methods
+that rely on Postgres-only features (arrays, tsvector, partitions, writable
+CTEs) are overridden below.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cogs.botDBMS import BotDatabase, content_scope
+from cogs.dbmetrics import note_rows
+from cogs.partitions import add_months, month_start
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(list, json.dumps)
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+LOCAL_NOW = "(datetime('now', 'localtime'))"
+
+SQLITE_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Initial schema", [
+        """
+        CREATE TABLE user_activities (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            command TEXT,
+            timestamp TIMESTAMP
+        )
+        """,
+        "CREATE INDEX idx_user_activities_user_ts ON user_activities (user_id, timestamp)",
+        """
+        CREATE TABLE user_activity_hourly (
+            user_id INTEGER NOT NULL,
+            hour INTEGER NOT NULL CHECK (hour BETWEEN 0 AND 23),
+            activity_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, hour)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE user_command_counts (
+            user_id INTEGER NOT NULL,
+            command TEXT NOT NULL,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, command)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE context_memory_seq (
+            user_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        """,
+        f"""
+        CREATE TABLE conversation_memory (
+            user_id INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            context TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT {LOCAL_NOW},
+            PRIMARY KEY (user_id, slot)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE user_points (
+            user_id INTEGER PRIMARY KEY,
+            activity_points INTEGER DEFAULT 0,
+            helpful_reactions INTEGER DEFAULT 0,
+            streak_days INTEGER DEFAULT 0,
+            last_active DATE,
+            total_score REAL GENERATED ALWAYS AS (
+                COALESCE(activity_points, 0) * 0.4
+                + COALESCE(helpful_reactions, 0) * 0.4
+                + COALESCE(streak_days, 0) * 0.2
+            ) STORED
+        )
+        """,
+        "CREATE INDEX idx_user_points_score ON user_points (total_score DESC, user_id)",
+        f"""
+        CREATE TABLE smart_reminders (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            reminder_text TEXT,
+            created_at TIMESTAMP DEFAULT {LOCAL_NOW},
+            scheduled_for TIMESTAMP,
+            context TEXT,
+            status TEXT DEFAULT 'pending'
+        )
+        """,
+        "CREATE INDEX idx_smart_reminders_user_scheduled ON smart_reminders (user_id, scheduled_for)",
+        "CREATE INDEX idx_smart_reminders_pending_due ON smart_reminders (scheduled_for) WHERE status = 'pending'",
+        f"""
+        CREATE TABLE content_categories (
+            id INTEGER PRIMARY KEY,
+            content TEXT,
+            categories TEXT,
+            keywords TEXT,
+            created_at TIMESTAMP DEFAULT {LOCAL_NOW}
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE content_categories_fts USING fts5(
+            content, content='content_categories', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER content_categories_fts_insert AFTER INSERT ON content_categories BEGIN
+            INSERT INTO content_categories_fts (rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+        f"""
+        CREATE TABLE gpt_conversation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            channel_id INTEGER,
+            message TEXT,
+            bot_response TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT {LOCAL_NOW},
+            context_digests TEXT
+        )
+        """,
+        """
+        CREATE INDEX idx_gpt_history_user_channel_ts
+        ON gpt_conversation_history (user_id, channel_id, timestamp DESC)
+        """,
+        """
+        CREATE VIRTUAL TABLE gpt_conversation_history_fts USING fts5(
+            message, bot_response, content='gpt_conversation_history', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER gpt_conversation_history_fts_insert AFTER INSERT ON gpt_conversation_history BEGIN
+            INSERT INTO gpt_conversation_history_fts (rowid, message, bot_response)
+            VALUES (new.id, new.message, new.bot_response);
+        END
+        """,
+        """
+        CREATE TRIGGER gpt_conversation_history_fts_delete AFTER DELETE ON gpt_conversation_history BEGIN
+            INSERT INTO gpt_conversation_history_fts (gpt_conversation_history_fts, rowid, message, bot_response)
+            VALUES ('delete', old.id, old.message, old.bot_response);
+        END
+        """,
+        """
+        CREATE TABLE conversation_context (
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (user_id, channel_id, digest)
+        ) WITHOUT ROWID
+        """,
+        f"""
+        CREATE TABLE feedback (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 10),
+            feedback_text TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT {LOCAL_NOW}
+        )
+        """,
+        """
+        CREATE TABLE feedback_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO feedback_stats (id) VALUES (1)",
+        # SQLite has no arrays, so the histogram is one row per rating
+        """
+        CREATE TABLE feedback_rating_counts (
+            rating INTEGER PRIMARY KEY CHECK (rating BETWEEN 1 AND 10),
+            rating_count INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        WITH RECURSIVE ratings (rating) AS (SELECT 1 UNION ALL SELECT rating + 1 FROM ratings WHERE rating < 10)
+        INSERT INTO feedback_rating_counts (rating) SELECT rating FROM ratings
+        """,
+    ]),
+    (2, "Rolling conversation summaries", [
+        f"""
+        CREATE TABLE conversation_summaries (
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            summary TEXT NOT NULL,
+            turns_covered INTEGER NOT NULL,
+            covered_until TIMESTAMP NOT NULL,
+            covered_id INTEGER NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT {LOCAL_NOW},
+            PRIMARY KEY (user_id, channel_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (3, "Per-guild response cache opt-out", [
+        f"""
+        CREATE TABLE response_cache_opt_outs (
+            guild_id INTEGER PRIMARY KEY,
+            opted_out_at TIMESTAMP NOT NULL DEFAULT {LOCAL_NOW}
+        )
+        """,
+    ]),
+    (4, "Scope categorized content to its guild and author", [
+        "ALTER TABLE content_categories ADD COLUMN guild_id INTEGER",
+        "ALTER TABLE content_categories ADD COLUMN user_id INTEGER",
+        "CREATE INDEX idx_content_categories_owner ON content_categories (guild_id, user_id)",
+    ]),
+]
+
+SQLITE_LATEST_VERSION = SQLITE_MIGRATIONS[-1][0]
+
+
+@lru_cache(maxsize=512)
+def to_sqlite_placeholders(query: str) -> str:
+    """Rewrite psycopg2's %s placeholders (and %% escapes) for sqlite3"""
+    return re.sub(r"%[s%]", lambda match: "?" if match.group() == "%s" else "%", query)
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Every word of `text` as a quoted FTS5 term, ANDed like websearch_to_tsquery; None if there are none"""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"' for word in words) if words else None
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """Cursor usable as a context manager that accepts the Postgres-style queries"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=()):
+        super().execute(to_sqlite_placeholders(query), params)
+        note_rows(self.rowcount)
+        return self
+
+    def executemany(self, query, params_seq):
+        super().executemany(to_sqlite_placeholders(query), params_seq)
+        note_rows(self.rowcount)
+        return self
+
+    def fetchone(self):
+        row = super().fetchone()
+        note_rows(row is not None)
+        return row
+
+    def fetchall(self):
+        rows = super().fetchall()
+        note_rows(len(rows))
+        return rows
+
+
+class SQLiteConnection(sqlite3.Connection):
+    closed = 0
+
+    def cursor(self, factory=SQLiteCursor):
+        return super().cursor(factory)
+
+
+class SQLitePool:
+    """
+    One SQLite connection per database thread, all on the same WAL-mode
+    file: readers never block the writer and writers wait up to
+    `busy_timeout` seconds for each other instead of failing.
+    Mirrors the ConnectionPool interface BotDatabase uses.
+    """
+
+    def __init__(self, path: str, maxconn: int = 4, busy_timeout: float = 5.0):
+        self.path = path
+        self.minconn = 0
+        self.maxconn = maxconn
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[SQLiteConnection] = []
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._checkouts = 0
+
+    def _connect(self) -> SQLiteConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread is off only so close() can run from the main thread
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, factory=SQLiteConnection,
+                                   detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Commits when the block succeeds, rolls back when it raises"""
+        conn = self._connect()
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                self._in_use -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self._in_use,
+                "idle": len(self._connections) - self._in_use,
+                "open": len(self._connections),
+                "checkouts": self._checkouts,
+                "waits": 0,
+                "wait_seconds": 0.0,
+                "timeouts": 0,
+                "health_check_failures": 0,
+                "discarded": 0,
+            }
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def run_sqlite_migrations(conn) -> int:
+    """Apply pending SQLITE_MIGRATIONS in one transaction, tracked in PRAGMA user_version"""
+    conn.execute("BEGIN IMMEDIATE")
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, description, statements in SQLITE_MIGRATIONS:
+        if version <= current:
+            continue
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        current = version
+        print(f"Applied database migration {version}: {description}")
+    return current
+
+
+class SQLiteBotDatabase(BotDatabase):
+    """BotDatabase on an embedded SQLite file (SQLITE_PATH)"""
+
+    def __init__(self, path: str = None, maxconn: int = None):
+        path = path or os.getenv("SQLITE_PATH", "encourage_bot.db")
+        super().__init__(pool=SQLitePool(path, maxconn=maxconn or int(os.getenv("SQLITE_WORKERS", "4"))))
+
+    def migrate(self) -> int:
+        with self.get_connection() as conn:
+            return run_sqlite_migrations(conn)
+
+    def _insert_values(self, cur, statement: str, rows: list, fetch: bool = False, page_size: int = 100):
+        if not rows:
+            return []
+        statement = statement.replace("VALUES %s", "VALUES (" + ", ".join(["%s"] * len(rows[0])) + ")")
+        if not fetch:
+            cur.executemany(statement, rows)
+            return None
+        # executemany cannot return rows, so RETURNING needs one execute per row
+        results = []
+        for row in rows:
+            results.extend(cur.execute(statement, row).fetchall())
+        return results
+
+    def _push_context_memory(self, cur, user_id: int, context: str, max_memory: int):
+        seq = cur.execute("""
+            INSERT INTO context_memory_seq (user_id, seq) VALUES (%s, 0)
+            ON CONFLICT (user_id) DO UPDATE SET seq = seq + 1
+            RETURNING seq
+        """, (user_id,)).fetchone()[0]
+        cur.execute("""
+            INSERT INTO conversation_memory (user_id, slot, context, timestamp)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id, slot)
+            DO UPDATE SET context = excluded.context, timestamp = excluded.timestamp
+        """, (user_id, seq % max_memory, context, datetime.now()))
+
+    def mark_reminders(self, reminder_ids: List[int], status: str) -> None:
+        if not reminder_ids:
+            return
+        ids = list(reminder_ids)
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"UPDATE smart_reminders SET status = %s WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                    (status, *ids)
+                )
+
+    def get_context_used(self, conversation_id: int) -> List[str]:
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.content
+                    FROM gpt_conversation_history h, json_each(h.context_digests) u
+                    JOIN conversation_context c
+                      ON c.user_id = h.user_id AND c.channel_id = h.channel_id AND c.digest = u.value
+                    WHERE h.id = %s
+                    ORDER BY u.key
+                """, (conversation_id,))
+                return [row[0] for row in cur.fetchall()]
+
+    def maintain_conversation_partitions(self, today: date = None) -> Dict[str, Any]:
+        """
+        SQLite has no partitions; with a retention period set, rows older
+        than it are deleted instead.
+        """
+        if self.retention_months <= 0:
+            return {"created": [], "dropped": [], "deleted_rows": 0}
+        cutoff = add_months(month_start(today or date.today()), -self.retention_months)
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM gpt_conversation_history WHERE timestamp < %s", (cutoff,))
+                deleted = cur.rowcount
+                cur.execute("DELETE FROM conversation_summaries WHERE covered_until < %s", (cutoff,))
+                if deleted:
+                    cur.execute("""
+                        DELETE FROM conversation_context
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM gpt_conversation_history h, json_each(h.context_digests) u
+                            WHERE h.user_id = conversation_context.user_id
+                              AND h.channel_id = conversation_context.channel_id
+                              AND u.value = conversation_context.digest
+                        )
+                    """)
+        if deleted:
+            self.history_cache.clear()
+        return {"created": [], "dropped": [], "deleted_rows": deleted}
+
+    def search_conversations(self, user_id: int, channel_id: int, query: str, limit: int = 5,
+                             after: tuple = None) -> List[Dict[str, Any]]:
+        match = fts_query(query)
+        if match is None:
+            return []
+        # bm25 is lower-is-better, so it is negated to keep the (rank, id) DESC ordering
+        return self._search("""
+            SELECT id, rank, message, bot_response, timestamp
+            FROM (
+                SELECT h.id AS id, -bm25(gpt_conversation_history_fts) AS rank,
+                       h.message AS message, h.bot_response AS bot_response, h.timestamp AS timestamp
+                FROM gpt_conversation_history_fts
+                JOIN gpt_conversation_history h ON h.id = gpt_conversation_history_fts.rowid
+                WHERE gpt_conversation_history_fts MATCH %s AND h.user_id = %s AND h.channel_id = %s
+            ) matches
+        """, (match, user_id, channel_id), limit, after)
+
+    def search_categorized_content(self, query: str, guild_id: Optional[int], user_id: int, limit: int = 5,
+                                   after: tuple = None) -> List[Dict[str, Any]]:
+        match = fts_query(query)
+        if match is None:
+            return []
+        scope, scope_params = content_scope(guild_id, user_id)
+        results = self._search(f"""
+            SELECT id, rank, content, categories, created_at
+            FROM (
+                SELECT c.id AS id, -bm25(content_categories_fts) AS rank,
+                       c.content AS content, c.categories AS categories, c.created_at AS created_at
+                FROM content_categories_fts
+                JOIN content_categories c ON c.id = content_categories_fts.rowid
+                WHERE content_categories_fts MATCH %s AND {scope}
+            ) matches
+        """, (match, *scope_params), limit, after)
+        for result in results:
+            result["categories"] = json.loads(result["categories"]) if result["categories"] else None
+        return results
+
+    def _bump_feedback_stats(self, cursor, rating: int):
+        cursor.execute("""
+            UPDATE feedback_stats SET rating_count = rating_count + 1, rating_sum = rating_sum + %s WHERE id = 1
+        """, (rating,))
+        cursor.execute("""
+            UPDATE feedback_rating_counts SET rating_count = rating_count + 1 WHERE rating = %s
+        """, (rating,))
+
+    def _read_rating_stats(self, cursor) -> tuple:
+        cursor.execute("SELECT rating_count, rating_sum FROM feedback_stats WHERE id = 1")
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute("SELECT rating_count FROM feedback_rating_counts ORDER BY rating")
+        return row[0], row[1], [count for (count,) in cursor.fetchall()]
+
+    def iter_feedback(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        with self.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, user_id, rating, feedback_text, timestamp
+                    FROM feedback
+                    ORDER BY id DESC
+                """)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    for row in rows:
+                        yield dict(zip(self.FEEDBACK_COLUMNS, row))
@@ -0,0 +1,87 @@
+import time
+from typing import Callable, List
+
+# Discord rejects messages longer than this
+MESSAGE_LIMIT = 2000
+
+
+def split_point(text: str, limit: int = MESSAGE_LIMIT) -> int:
+    """Where to cut `text` so the head fits in one message, preferring line then word breaks"""
+    if len(text) <= limit:
+        return len(text)
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, 0, limit)
+        if cut >= limit // 2:
+            return cut
+    return limit
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Break a reply into pieces Discord will accept"""
+    parts = []
+    while text:
+        cut = split_point(text, limit)
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n ")
+    return parts
+
+
+class StreamingReply:
+    """
+    Shows a reply while it is still being generated.
+
+    The first piece is posted as soon as it arrives; later pieces edit that
+    message at most once per `edit_interval` seconds to stay inside Discord's
+    edit rate limits. Once the text outgrows one message the full part is
+    finalized and the rest continues in a new message.
+    """
+
+    def __init__(self, channel, edit_interval: float = 1.0, limit: int = MESSAGE_LIMIT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.clock = clock
+        self.text = ""
+        self.messages = []
+        self._offset = 0
+        self._message = None
+        self._shown = ""
+        self._last_update = 0.0
+
+    async def append(self, piece: str):
+        self.text += piece
+        await self._render(final=False)
+
+    async def finish(self) -> str:
+        """Show everything that is left and return the whole reply"""
+        await self._render(final=True)
+        return self.text
+
+    async def _render(self, final: bool):
+        while len(self.text) - self._offset > self.limit:
+            pending = self.text[self._offset:]
+            cut = split_point(pending, self.limit)
+            await self._show(pending[:cut])
+            self._offset += cut
+            while self._offset < len(self.text) and self.text[self._offset] in "\n ":
+                self._offset += 1
+            self._message = None
+            self._shown = ""
+
+        current = self.text[self._offset:]
+        if not current.strip():
+            return
+        if final or self._message is None or self.clock() - self._last_update >= self.edit_interval:
+            await self._show(current)
+
+    async def _show(self, content: str):
+        if content == self._shown:
+            return
+        if self._message is None:
+            self._message = await self.channel.send(content)
+            self.messages.append(self._message)
+        else:
+            await self._message.edit(content=content)
+        self._shown = content
+        self._last_update = self.clock()
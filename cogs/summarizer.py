@@ -0,0 +1,163 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cogs.contextbuilder import TokenCounter
+
+SUMMARY_INSTRUCTIONS = (
+    "You keep a running summary of a conversation between a user and an assistant. "
+    "Fold the new turns into the existing summary. Keep the facts, preferences, decisions "
+    "and open questions the assistant will need later and leave out small talk. "
+    "Reply with the updated summary only, in at most {words} words."
+)
+
+
+class ConversationCompactor:
+    """
+    Folds older conversation turns into a stored rolling summary.
+
+    Every `compact_every` turns in a (user, channel) a background task looks
+    at the history; if more than `keep_turns` turns are not yet covered by
+    the summary, the oldest of them (at most `batch_limit` per LLM call) are
+    summarized together with the existing summary. The newest `keep_turns`
+    turns are always left as they are. A reply sends the summary plus every
+    turn after the point it covers (see `load_context`), so turns that piled
+    up since the last compaction are never dropped. Nothing here runs on the
+    reply path.
+    """
+
+    def __init__(self, db, llm, keep_turns: int = 10, compact_every: int = 10, batch_limit: int = 50,
+                 summary_tokens: int = 300, turn_tokens: int = 200, counter: TokenCounter = None,
+                 max_pending: int = 10000):
+        self.db = db
+        self.llm = llm
+        self.keep_turns = keep_turns
+        self.compact_every = compact_every
+        self.batch_limit = batch_limit
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.counter = counter or TokenCounter()
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+        self._running: Dict[Tuple[int, int], asyncio.Task] = {}
+        self.compactions = 0
+        self.turns_folded = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, db, llm, keep_turns: int) -> "ConversationCompactor":
+        return cls(
+            db,
+            llm,
+            keep_turns=keep_turns,
+            compact_every=int(os.getenv("SUMMARY_COMPACT_EVERY", "10")),
+            batch_limit=int(os.getenv("SUMMARY_BATCH_TURNS", "50")),
+            summary_tokens=int(os.getenv("SUMMARY_MAX_TOKENS", "300")),
+            counter=TokenCounter(os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")),
+        )
+
+    @property
+    def window_turns(self) -> int:
+        """Most unsummarized turns a conversation holds, with room for a compaction in flight"""
+        return self.keep_turns + 2 * self.compact_every
+
+    async def load_context(self, user_id: int, channel_id: int, recent_turns: int) -> Tuple[list, Optional[str]]:
+        """
+        Newest-first turns to send with a reply and the summary text, if any.
+        With a summary these are all turns after the point it covers, so
+        nothing falls between the summary and the turns; without one the
+        newest `recent_turns`.
+        """
+        summary = await self.db.get_conversation_summary(user_id, channel_id)
+        if summary is None:
+            return await self.db.get_recent_conversations(user_id, channel_id, recent_turns), None
+        turns = await self.db.get_recent_conversations(
+            user_id, channel_id, self.window_turns, after=summary["covered_until"]
+        )
+        return turns, summary["summary"]
+
+    def note_turn(self, user_id: int, channel_id: int):
+        """Count a new turn and start a compaction once enough have piled up"""
+        key = (user_id, channel_id)
+        count = self._pending.pop(key, 0) + 1
+        if count < self.compact_every or key in self._running:
+            self._pending[key] = count
+            # Counts of conversations that went quiet are dropped oldest first
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            return
+        task = asyncio.create_task(self.compact(user_id, channel_id))
+        self._running[key] = task
+        task.add_done_callback(lambda _: self._running.pop(key, None))
+
+    async def forget(self, user_id: int, channel_id: int):
+        """Reset the turn count and stop any compaction of a conversation that is being cleared"""
+        key = (user_id, channel_id)
+        self._pending.pop(key, None)
+        task = self._running.get(key)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def compact(self, user_id: int, channel_id: int) -> int:
+        """Fold every foldable turn into the summary; returns the number of turns folded"""
+        folded = 0
+        try:
+            while True:
+                current = await self.db.get_conversation_summary(user_id, channel_id)
+                after = (current["covered_until"], current["covered_id"]) if current else None
+                turns = await self.db.get_turns_to_summarize(
+                    user_id, channel_id, self.keep_turns, self.batch_limit, after
+                )
+                if not turns:
+                    break
+                summary = await self.llm.chat(
+                    self._prompt(current["summary"] if current else None, turns),
+                    temperature=0.3,
+                    max_tokens=self.summary_tokens,
+                )
+                last = turns[-1]
+                saved = await self.db.save_conversation_summary(
+                    user_id, channel_id, summary,
+                    (current["turns_covered"] if current else 0) + len(turns),
+                    last["timestamp"], last["id"], current["covered_id"] if current else None
+                )
+                if not saved:
+                    # Cleared or compacted elsewhere while the summary was being written
+                    break
+                folded += len(turns)
+                if len(turns) < self.batch_limit:
+                    break
+        except Exception as e:
+            self.failures += 1
+            print(f"Error compacting conversation history for {user_id} in {channel_id}: {e}")
+        if folded:
+            self.compactions += 1
+            self.turns_folded += folded
+        return folded
+
+    def _prompt(self, summary: Optional[str], turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        lines = []
+        for turn in turns:
+            lines.append(f"User: {self.counter.truncate(turn['message'] or '', self.turn_tokens)}")
+            lines.append(f"Assistant: {self.counter.truncate(turn['bot_response'] or '', self.turn_tokens)}")
+        words = max(self.summary_tokens * 3 // 4, 20)
+        return [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(words=words)},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none yet)'}\n\nNew turns:\n" + "\n".join(lines)},
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "running": len(self._running),
+            "compactions": self.compactions,
+            "turns_folded": self.turns_folded,
+            "failures": self.failures,
+        }
+
+    async def close(self):
+        """Wait for compactions that are already running"""
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
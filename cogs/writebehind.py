@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+class ConversationWriter:
+    """
+    Write-behind buffer for conversation turns.
+
+    Replies are sent before anything touches the database: turns are queued
+    in memory and written with one multi-row INSERT once `batch_size` rows
+    are waiting or `flush_interval` seconds have passed, whichever is first.
+
+    With a `spill_path`, batches that cannot be written while the database
+    is down are appended to that JSON-lines file instead of being held in
+    memory, and replayed by the next flush (including the interval tick and
+    close()) that finds the database writable again.
+    """
+
+    def __init__(self, db, batch_size: int = 50, flush_interval: float = 2.0, max_buffer: int = 10000,
+                 spill_path: Optional[str] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spill_path = spill_path
+        self._buffer = []
+        # (user_id, channel_id) -> when it was cleared; older turns are never written
+        self._cleared: Dict[Tuple[int, int], datetime] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        """Start the background flush loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, user_id: int, channel_id: int, message: str, bot_response: str, context_used: list):
+        """Queue a conversation turn; it is timestamped now, not when flushed"""
+        if self._closed:
+            raise RuntimeError("ConversationWriter is closed")
+        timestamp = datetime.now()
+        self._buffer.append((user_id, channel_id, message, bot_response, context_used, timestamp))
+        # Write-through to the hot tier so the next mention sees this turn before it is flushed
+        self.db.history_cache.append(user_id, channel_id, message, bot_response, timestamp)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def discard(self, user_id: int, channel_id: int):
+        """
+        Drop queued turns for a conversation that is being cleared. Waits for
+        a flush already in flight, so nothing it writes lands after the
+        caller's DELETE; turns it fails to write and spilled turns are dropped too.
+        """
+        self._cleared[(user_id, channel_id)] = datetime.now()
+        self._buffer = self._drop_cleared(self._buffer)
+        async with self._flush_lock:
+            pass
+
+    def _drop_cleared(self, rows: list) -> list:
+        if not self._cleared:
+            return rows
+        return [row for row in rows if row[5] > self._cleared.get((row[0], row[1]), datetime.min)]
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write everything buffered so far, then any spilled turns; returns the
+        number of rows written. Spilled turns are retried even when nothing
+        new is buffered, so they reach the database once it is back.
+        """
+        async with self._flush_lock:
+            written = 0
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                try:
+                    await self.db.store_conversations(batch)
+                except Exception as e:
+                    print(f"Error flushing conversation batch: {e}")
+                    batch = self._drop_cleared(batch)
+                    if not batch:
+                        return 0
+                    if self.spill_path and await self._spill(batch):
+                        return 0
+                    # Keep the rows for the next attempt, dropping the oldest if we overflow
+                    self._buffer[:0] = batch
+                    overflow = len(self._buffer) - self.max_buffer
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        print(f"Dropped {overflow} buffered conversation turns")
+                    return 0
+                written = len(batch)
+            if self.spill_path and os.path.exists(self.spill_path):
+                written += await self._replay_spill()
+                if os.path.exists(self.spill_path):
+                    return written
+            # Nothing older than the clears is left anywhere
+            self._cleared.clear()
+            return written
+
+    async def _spill(self, batch: list) -> bool:
+        try:
+            await asyncio.to_thread(self._append_spill, batch)
+        except OSError as e:
+            print(f"Error writing conversation spill file: {e}")
+            return False
+        print(f"Spilled {len(batch)} conversation turns to {self.spill_path}")
+        return True
+
+    def _append_spill(self, rows: list, path: str = None, mode: str = "a"):
+        with open(path or self.spill_path, mode, encoding="utf-8") as f:
+            for user_id, channel_id, message, bot_response, context_used, timestamp in rows:
+                f.write(json.dumps([user_id, channel_id, message, bot_response, context_used, timestamp.isoformat()]) + "\n")
+
+    def _read_spill(self) -> List[tuple]:
+        with open(self.spill_path, encoding="utf-8") as f:
+            return [
+                (user_id, channel_id, message, bot_response, context_used, datetime.fromisoformat(timestamp))
+                for user_id, channel_id, message, bot_response, context_used, timestamp in map(json.loads, f)
+            ]
+
+    async def _replay_spill(self) -> int:
+        """Write spilled turns back in batches; whatever is left stays on disk"""
+        spilled = await asyncio.to_thread(self._read_spill)
+        rows = self._drop_cleared(spilled)
+        for start in range(0, len(rows), self.batch_size):
+            try:
+                await self.db.store_conversations(rows[start:start + self.batch_size])
+            except Exception as e:
+                print(f"Error replaying conversation spill file: {e}")
+                # An untouched file is left as it is; the interval tick retries it while the database is down
+                if start or len(rows) != len(spilled):
+                    await asyncio.to_thread(self._rewrite_spill, rows[start:])
+                return start
+        await asyncio.to_thread(os.remove, self.spill_path)
+        print(f"Replayed {len(rows)} spilled conversation turns")
+        return len(rows)
+
+    def _rewrite_spill(self, rows: list):
+        # Swap the file in one step so a crash never leaves replayed rows behind twice
+        pending_path = self.spill_path + ".tmp"
+        self._append_spill(rows, pending_path, mode="w")
+        os.replace(pending_path, self.spill_path)
+
+    async def close(self):
+        """Stop the flush loop and drain whatever is still buffered"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
@@ -3,14 +3,27 @@ from dotenv import load_dotenv
 import discord
 from discord.ext import commands
 import asyncio
-import openai
-from cogs.botDBMS import BotDatabase
+from cogs.botDBMS import get_async_database
+from cogs.writebehind import ConversationWriter
+from cogs.llmclient import LLMClient, LLMAuthenticationError, LLMRateLimitError, LLMError
+from cogs.streamreply import StreamingReply, split_message
+from cogs.contextbuilder import ContextBuilder
+from cogs.summarizer import ConversationCompactor
+from cogs.responsecache import ResponseCache
 
 # Load environment variables
 load_dotenv()
 
-# Set OpenAI API Key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Pooled async client for OpenAI-compatible chat completions
+llm = LLMClient.from_env()
+# Stream replies into a message that is edited as the text arrives
+STREAM_REPLIES = os.getenv("LLM_STREAM_REPLIES", "1") != "0"
+STREAM_EDIT_SECONDS = float(os.getenv("LLM_STREAM_EDIT_SECONDS", "1.0"))
+# Fits recent turns into the prompt token budget
+context_builder = ContextBuilder.from_env()
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "10"))
+# Replies to repeated prompts in the same context, reused without an API call
+response_cache = ResponseCache.from_env()
 
 # Initialize Discord bot
 intents = discord.Intents.default()
@@ -19,22 +32,28 @@ intents.members = True
 
 client = commands.Bot(command_prefix='!', intents=intents)
 
-db = BotDatabase()
+db = get_async_database()
+conversation_writer = ConversationWriter(
+    db,
+    batch_size=int(os.getenv("CONVERSATION_BATCH_SIZE", "50")),
+    flush_interval=float(os.getenv("CONVERSATION_FLUSH_SECONDS", "2")),
+    spill_path=os.getenv("CONVERSATION_SPILL_FILE", "conversation_spill.jsonl")
+)
+client.conversation_writer = conversation_writer
+# Folds turns older than the recent window into a rolling summary, off the reply path
+conversation_compactor = ConversationCompactor.from_env(db, llm, keep_turns=CONTEXT_MAX_TURNS)
+client.conversation_compactor = conversation_compactor
+client.response_cache = response_cache
 
-def format_conversation_history(conversations):
-    """Format conversation history for the GPT context"""
-    formatted_history = []
-    for msg, response in conversations:
-        formatted_history.extend([
-            {"role": "user", "content": msg},
-            {"role": "assistant", "content": response}
-        ])
-    return formatted_history
+# Modules in ./cogs that hold shared helpers rather than extensions
+HELPER_MODULES = {"__init__.py", "utils.py", "dbpool.py", "migrations.py", "writebehind.py", "historycache.py",
+                  "categorizer.py", "pagination.py", "partitions.py", "dbmetrics.py", "circuitbreaker.py",
+                  "sqlitedb.py", "llmclient.py", "streamreply.py",
+                  "contextbuilder.py", "summarizer.py", "responsecache.py"}
 
 @client.event
 async def on_ready():
     print(f'We have logged in as {client.user}')
-    db.setup_conversation_table()
     print('--------------------------------------')
 
 @client.event
@@ -51,48 +70,67 @@ async def on_message(message):
         channel = message.channel
         async with channel.typing():  # Show typing indicator
             try:
-                if not openai.api_key:
+                if not llm.api_key:
                     await channel.send("OpenAI API key is not configured.")
                     print("Error: OpenAI API key is not set")
                     return
 
-                recent_conversations = db.get_recent_conversations(
-                    message.author.id,
-                    channel.id
-                )
-                
-                messages = format_conversation_history(recent_conversations)
-                messages.append({"role": "user", "content": message.content})
+                try:
+                    recent_conversations, summary = await conversation_compactor.load_context(
+                        message.author.id, channel.id, CONTEXT_MAX_TURNS
+                    )
+                except Exception as e:
+                    # Degraded mode: still answer, just without earlier turns
+                    print(f"Replying without history: {e}")
+                    recent_conversations, summary = [], None
                 
-                response = await asyncio.to_thread(
-                    openai.ChatCompletion.create,
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=1,
-                    max_tokens=2048,
-                    top_p=1,
-                    frequency_penalty=0,
-                    presence_penalty=0
+                messages, report = context_builder.build(recent_conversations, message.content, summary)
+                print(
+                    f"Prompt for {message.author.id}: {report.tokens}/{report.budget} tokens, "
+                    f"{report.turns_included} turns ({report.turns_truncated} truncated, {report.turns_dropped} dropped), "
+                    f"summary {report.summary_tokens} tokens"
                 )
                 
-                messageToSend = response['choices'][0]['message']['content'].strip()
-                
-                db.store_conversation(
+                params = dict(temperature=1, max_tokens=2048, top_p=1, frequency_penalty=0, presence_penalty=0)
+                use_cache = response_cache.enabled_for(message.guild.id if message.guild else None)
+                cache_key = response_cache.key(message.content, messages[:-1], model=llm.model, **params) if use_cache else None
+                cached = response_cache.get(cache_key) if use_cache else None
+                if cached is not None:
+                    messageToSend = cached
+                    for part in split_message(messageToSend):
+                        await channel.send(part)
+                elif STREAM_REPLIES:
+                    reply = StreamingReply(channel, edit_interval=STREAM_EDIT_SECONDS)
+                    async for piece in llm.chat_stream(messages, **params):
+                        await reply.append(piece)
+                    messageToSend = (await reply.finish()).strip()
+                else:
+                    messageToSend = await llm.chat(messages, **params)
+                    for part in split_message(messageToSend):
+                        await channel.send(part)
+
+                if not messageToSend:
+                    return
+                if use_cache and cached is None:
+                    response_cache.put(cache_key, messageToSend)
+
+                # Persisted in the background so the reply never waits on the database
+                conversation_writer.enqueue(
                     message.author.id,
                     channel.id,
                     message.content,
                     messageToSend,
                     [msg['content'] for msg in messages[:-1]]  
                 )
-                await channel.send(messageToSend)
+                conversation_compactor.note_turn(message.author.id, channel.id)
                     
-            except openai.error.AuthenticationError:
+            except LLMAuthenticationError:
                 await channel.send("Authentication error with OpenAI API. Please check the API key.")
                 print("Error: Invalid OpenAI API key")
-            except openai.error.RateLimitError:
+            except LLMRateLimitError:
                 await channel.send("Rate limit exceeded with OpenAI API. Please try again later.")
                 print("Error: OpenAI API rate limit exceeded")
-            except openai.error.APIError as e:
+            except LLMError as e:
                 await channel.send("An error occurred with the OpenAI API. Please try again later.")
                 print(f"OpenAI API error: {e}")
             except Exception as e:
@@ -102,7 +140,7 @@ async def on_message(message):
 
 async def load_extensions():
     for filename in os.listdir("./cogs"):
-        if filename.endswith(".py") and filename != "__init__.py" and filename != "utils.py":
+        if filename.endswith(".py") and filename not in HELPER_MODULES:
             try:
                 await client.load_extension(f"cogs.{filename[:-3]}")
                 print(f"Loaded extension: {filename[:-3]}")
@@ -110,6 +148,16 @@ async def load_extensions():
                 print(f"Failed to load extension {filename[:-3]}: {e}")
 
 async def main():
+    try:
+        version = await db.migrate()
+        print(f"Database schema is at version {version}")
+    except Exception as e:
+        print(f"Database migration failed: {e}")
+    try:
+        response_cache.load_opt_outs(await db.get_response_cache_opt_outs())
+    except Exception as e:
+        print(f"Could not load response cache opt-outs: {e}")
+    conversation_writer.start()
     await load_extensions()
     token = os.getenv('TOKEN')
     if token is None:
@@ -120,6 +168,11 @@ async def main():
         print("Failed to login. Please check your token.")
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        await conversation_compactor.close()
+        await llm.close()
+        await conversation_writer.close()
+        db.close()
         
 def get_bot():
     return client
@@ -0,0 +1,105 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import MagicMock, AsyncMock, patch
+import discord
+from cogs.activity import ActivityBuffer, ActivityTracker
+
+
+def test_buffer_interns_commands_and_drains_rows():
+    # Arrange
+    buffer = ActivityBuffer()
+    buffer.add(1, "hello", 1_700_000_000.0)
+    buffer.add(2, None, 1_700_000_060.0)
+    buffer.add(1, "hello", 1_700_000_120.0)
+
+    # Act
+    rows = buffer.drain()
+
+    # Assert
+    assert [(user_id, command) for user_id, command, _ in rows] == [(1, "hello"), (2, None), (1, "hello")]
+    assert len(buffer) == 0
+
+
+@pytest_asyncio.fixture
+async def tracker(bot):
+    with patch('cogs.activity.get_async_database') as get_db:
+        get_db.return_value.record_activities = AsyncMock()
+        tracker = ActivityTracker(bot)
+        yield tracker
+        tracker.flush_activity.cancel()
+
+
+def make_message(user_id, content="hi there"):
+    message = MagicMock(spec=discord.Message)
+    message.author = MagicMock(spec=discord.Member)
+    message.author.id = user_id
+    message.author.bot = False
+    message.content = content
+    return message
+
+
+@pytest.mark.asyncio
+async def test_chat_messages_are_throttled_per_user(tracker):
+    # Act
+    await tracker.on_message(make_message(1))
+    await tracker.on_message(make_message(1))
+    await tracker.on_message(make_message(2))
+    await tracker.on_message(make_message(3, "!hello"))
+
+    # Assert
+    assert len(tracker.buffer) == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_one_batch(tracker, ctx):
+    # Arrange
+    ctx.command = MagicMock(qualified_name="hello")
+    await tracker.on_command(ctx)
+    await tracker.on_message(make_message(5))
+
+    # Act
+    written = await tracker.flush()
+
+    # Assert
+    assert written == 2
+    tracker.db.record_activities.assert_awaited_once()
+    assert len(tracker.db.record_activities.call_args.args[0]) == 2
+
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_events_for_the_next_attempt(tracker):
+    # Arrange
+    tracker.max_buffer = 2
+    tracker.record(1, "hello")
+    tracker.record(2, "ping")
+    tracker.db.record_activities.side_effect = [RuntimeError("database down"), RuntimeError("database down"), None]
+
+    # Act
+    failed = await tracker.flush()
+    tracker.record(3, "help")
+    failed_again = await tracker.flush()
+    written = await tracker.flush()
+
+    # Assert
+    assert failed == failed_again == 0
+    assert written == 2
+    rows = tracker.db.record_activities.call_args.args[0]
+    assert [(user_id, command) for user_id, command, _ in rows] == [(2, "ping"), (3, "help")]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_flushes_in_a_tracked_task(tracker):
+    # Arrange
+    tracker.batch_size = 2
+
+    # Act
+    tracker.record(1)
+    tracker.record(2)
+    task = tracker._flush_task
+    tracker.record(3)
+    await task
+
+    # Assert
+    assert tracker._flush_task is task
+    tracker.db.record_activities.assert_awaited_once()
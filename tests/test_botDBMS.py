@@ -0,0 +1,434 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+import threading
+import discord
+import psycopg2
+import psycopg2.errors
+from cogs.dbpool import ConnectionPool, PoolTimeout
+from cogs.dbmetrics import QueryMetrics
+from cogs.botDBMS import BotDatabase, AsyncBotDatabase, CogDBMS, get_database, get_async_database
+
+
+def make_connection():
+    conn = MagicMock()
+    conn.closed = 0
+    return conn
+
+
+@pytest.fixture
+def pg_pool():
+    with patch('cogs.dbpool.pg_pool.ThreadedConnectionPool') as pool_cls:
+        pool = pool_cls.return_value
+        pool._pool = []
+        pool.closed = False
+        pool.getconn.side_effect = lambda: make_connection()
+        yield pool
+
+
+def test_pool_reuses_and_counts_checkouts(pg_pool):
+    # Arrange
+    pool = ConnectionPool({}, minconn=1, maxconn=2)
+
+    # Act
+    with pool.connection() as conn:
+        assert pool.stats()['in_use'] == 1
+
+    # Assert
+    conn.commit.assert_called_once()
+    pg_pool.putconn.assert_called_once_with(conn)
+    stats = pool.stats()
+    assert stats['in_use'] == 0
+    assert stats['checkouts'] == 1
+
+
+def test_pool_rolls_back_on_error(pg_pool):
+    # Arrange
+    pool = ConnectionPool({}, minconn=1, maxconn=2)
+
+    # Act
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("boom")
+
+    # Assert
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    pg_pool.putconn.assert_called_once_with(conn)
+
+
+def test_pool_discards_broken_connections(pg_pool):
+    # Arrange
+    pool = ConnectionPool({}, minconn=1, maxconn=2)
+
+    # Act
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("server closed the connection")
+
+    # Assert
+    pg_pool.putconn.assert_called_once_with(conn, close=True)
+    assert pool.stats()['discarded'] == 1
+
+
+def test_pool_keeps_connection_after_server_side_error(pg_pool):
+    # Arrange
+    pool = ConnectionPool({}, minconn=1, maxconn=2)
+
+    # Act
+    with pytest.raises(psycopg2.errors.DeadlockDetected):
+        with pool.connection() as conn:
+            raise psycopg2.errors.DeadlockDetected("deadlock detected")
+
+    # Assert
+    conn.rollback.assert_called_once()
+    pg_pool.putconn.assert_called_once_with(conn)
+    assert pool.stats()['discarded'] == 0
+
+
+def test_pool_health_check_replaces_stale_connection(pg_pool):
+    # Arrange
+    stale = make_connection()
+    stale.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError()
+    fresh = make_connection()
+    pg_pool.getconn.side_effect = [stale, stale, fresh]
+    pool = ConnectionPool({}, minconn=1, maxconn=2, health_check_interval=0)
+    with pool.connection():
+        pass
+
+    # Act
+    with pool.connection() as conn:
+        pass
+
+    # Assert
+    assert conn is fresh
+    assert pool.stats()['health_check_failures'] == 1
+
+
+def test_pool_times_out_when_exhausted(pg_pool):
+    # Arrange
+    pool = ConnectionPool({}, minconn=1, maxconn=1, acquire_timeout=0.01)
+    held = pool.acquire()
+
+    # Act / Assert
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(held)
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 1
+
+
+def test_pool_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool({}, minconn=5, maxconn=2)
+
+
+def test_get_database_is_shared():
+    assert get_database() is get_database()
+
+
+def test_bot_database_runs_through_pool(pg_pool):
+    # Arrange
+    db = BotDatabase(pool=ConnectionPool({}, minconn=1, maxconn=2))
+
+    # Act
+    db.clear_user_history(1, 2)
+
+    # Assert
+    pg_pool.getconn.assert_called_once()
+    pg_pool.putconn.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_database_runs_off_the_event_loop():
+    # Arrange
+    db = MagicMock(spec=BotDatabase)
+    db.pool = MagicMock(maxconn=2)
+    db.metrics = QueryMetrics()
+    callers = []
+    db.get_recent_conversations.side_effect = lambda *args: callers.append(threading.current_thread()) or [("hi", "hello")]
+    async_db = AsyncBotDatabase(db)
+
+    # Act
+    result = await async_db.get_recent_conversations(1, 2)
+
+    # Assert
+    assert result == [("hi", "hello")]
+    db.get_recent_conversations.assert_called_once_with(1, 2)
+    assert callers[0] is not threading.current_thread()
+    async_db.close()
+
+
+def test_get_async_database_wraps_shared_database():
+    assert get_async_database().db is get_database()
+
+
+@pytest.mark.asyncio
+async def test_clear_context_awaits_database(bot, ctx):
+    # Arrange
+    cog = CogDBMS(bot)
+    cog.db = MagicMock()
+    cog.db.clear_user_history = AsyncMock()
+
+    # Act
+    await cog.clear_context.callback(cog, ctx)
+
+    # Assert
+    cog.db.clear_user_history.assert_awaited_once_with(ctx.author.id, ctx.channel.id)
+    ctx.send.assert_called_once_with("Your conversation history has been cleared!")
+
+
+def test_migrations_apply_pending_versions_once():
+    # Arrange
+    from cogs.migrations import run_migrations, MIGRATIONS, LATEST_VERSION
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchone.return_value = (0,)
+
+    # Act
+    version = run_migrations(conn)
+
+    # Assert
+    assert version == LATEST_VERSION
+    executed = [c.args[0] for c in cur.execute.call_args_list]
+    statement_count = sum(len(statements) for _, _, statements in MIGRATIONS)
+    assert sum(1 for sql in executed if "INSERT INTO schema_migrations" in sql) == len(MIGRATIONS)
+    assert len(executed) == 3 + statement_count + len(MIGRATIONS)
+
+
+def test_migrations_skip_when_up_to_date():
+    # Arrange
+    from cogs.migrations import run_migrations, LATEST_VERSION
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchone.return_value = (LATEST_VERSION,)
+
+    # Act
+    version = run_migrations(conn)
+
+    # Assert
+    assert version == LATEST_VERSION
+    assert cur.execute.call_count == 3
+
+
+def test_store_conversations_writes_each_context_once():
+    # Arrange
+    from cogs.botDBMS import context_digest
+    db = BotDatabase(pool=MagicMock())
+    rows = [
+        (1, 2, "second", "reply 2", ["first", "reply 1"], None),
+        (1, 2, "third", "reply 3", ["first", "reply 1", "second", "reply 2"], None),
+    ]
+
+    # Act
+    with patch('cogs.botDBMS.execute_values') as execute_values:
+        db.store_conversations(rows)
+
+    # Assert
+    (_, context_sql, contexts), (_, history_sql, history) = [c.args for c in execute_values.call_args_list]
+    assert "conversation_context" in context_sql
+    assert sorted(c[3] for c in contexts) == ["first", "reply 1", "reply 2", "second"]
+    assert history[1][4] == [context_digest(c) for c in rows[1][4]]
+    assert context_digest("hello") == "5d41402abc4b2a76b9719d911017c592"
+
+
+@pytest.mark.asyncio
+async def test_show_rankings_resolves_names_in_one_batch(bot, ctx):
+    # Arrange
+    cog = CogDBMS(bot)
+    cog.db = MagicMock()
+    cog.db.create_dynamic_user_rankings = AsyncMock(return_value=[
+        {"rank": 1, "user_id": 1, "activity_points": 5, "helpful_reactions": 1, "streak_days": 2, "total_score": 2.8},
+        {"rank": 2, "user_id": 2, "activity_points": 3, "helpful_reactions": 0, "streak_days": 1, "total_score": 1.4},
+    ])
+    cached = MagicMock(display_name="Cached")
+    fetched = MagicMock(id=2, display_name="Fetched")
+    ctx.guild = MagicMock(spec=discord.Guild)
+    ctx.guild.get_member.side_effect = lambda user_id: cached if user_id == 1 else None
+    ctx.guild.query_members = AsyncMock(return_value=[fetched])
+    bot.get_user.return_value = None
+
+    # Act
+    await cog.show_rankings.callback(cog, ctx)
+
+    # Assert
+    cog.db.create_dynamic_user_rankings.assert_awaited_once_with(10, None)
+    ctx.guild.query_members.assert_awaited_once_with(user_ids=[2], limit=1)
+    embed = ctx.send.call_args.kwargs['embed']
+    assert [field.name for field in embed.fields] == ["#1 Cached", "#2 Fetched"]
+    assert ctx.send.call_args.kwargs['view'].next_page.disabled
+
+
+def test_context_memory_cache_is_untouched_when_commit_fails():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("first",)]
+    db = BotDatabase(pool=pool)
+    db.implement_context_memory(1, "first", max_memory=2)
+    pool.connection.return_value.__exit__.side_effect = psycopg2.errors.SerializationFailure("commit failed")
+
+    # Act
+    with pytest.raises(psycopg2.errors.SerializationFailure):
+        db.implement_context_memory(1, "lost", max_memory=2)
+
+    # Assert
+    assert list(db._context_memory[1]) == ["first"]
+
+
+def test_record_activities_updates_rollups_in_same_transaction():
+    # Arrange
+    from datetime import datetime
+    pool = MagicMock()
+    db = BotDatabase(pool=pool)
+    rows = [
+        (1, "hello", datetime(2024, 1, 1, 9, 5)),
+        (1, None, datetime(2024, 1, 1, 9, 40)),
+        (1, "hello", datetime(2024, 1, 1, 21, 0)),
+    ]
+
+    # Act
+    with patch('cogs.botDBMS.execute_values') as execute_values:
+        db.record_activities(rows)
+
+    # Assert
+    pool.connection.assert_called_once()
+    raw, hourly, commands = [c.args for c in execute_values.call_args_list]
+    assert raw[2] == rows
+    assert hourly[2] == [(1, 9, 2), (1, 21, 1)]
+    assert commands[2] == [(1, "hello", 2)]
+
+
+def test_context_memory_is_one_statement_once_cached():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("first",)]
+    db = BotDatabase(pool=pool)
+
+    # Act
+    first = db.implement_context_memory(1, "first", max_memory=2)
+    cur.execute.reset_mock()
+    second = db.implement_context_memory(1, "second", max_memory=2)
+    third = db.implement_context_memory(1, "third", max_memory=2)
+
+    # Assert
+    assert first == ["first"]
+    assert second == ["second", "first"]
+    assert third == ["third", "second"]
+    assert cur.execute.call_count == 2
+    assert all("ON CONFLICT (user_id, slot)" in c.args[0] for c in cur.execute.call_args_list)
+
+
+def test_search_continues_below_previous_page():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.description = [("id",), ("rank",), ("message",), ("bot_response",), ("timestamp",)]
+    cur.fetchall.return_value = [(9, 0.5, "hi", "hello", None)]
+    db = BotDatabase(pool=pool)
+
+    # Act
+    results = db.search_conversations(1, 2, "hello world", limit=5, after=(0.7, 12))
+
+    # Assert
+    sql, params = cur.execute.call_args.args
+    assert "search_vector @@ q" in sql
+    assert "(rank, id) < (%s, %s)" in sql
+    assert "channel_id = %s" in sql
+    assert params == ("hello world", 1, 2, 0.7, 12, 5)
+    assert results == [{"id": 9, "rank": 0.5, "message": "hi", "bot_response": "hello", "timestamp": None}]
+
+
+def test_save_feedback_updates_aggregate_in_same_transaction():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    db = BotDatabase(pool=pool)
+
+    # Act
+    assert db.save_feedback("user#1", 8, "great bot") is True
+
+    # Assert
+    pool.connection.assert_called_once()
+    insert, update = cur.execute.call_args_list
+    assert "INSERT INTO feedback" in insert.args[0]
+    assert "histogram[%s] = histogram[%s] + 1" in update.args[0]
+    assert update.args[1] == (8, 8, 8)
+
+
+def test_rating_distribution_is_derived_from_histogram():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchone.return_value = (4, 26, [0, 0, 0, 0, 1, 0, 0, 1, 0, 2])
+    db = BotDatabase(pool=pool)
+
+    # Act
+    stats = db.get_rating_distribution()
+
+    # Assert
+    assert stats["count"] == 4
+    assert stats["average"] == 6.5
+    assert stats["histogram"][10] == 2
+    assert stats["percentiles"] == {25: 5, 50: 8, 75: 10, 90: 10}
+
+
+def test_iter_feedback_streams_through_server_side_cursor():
+    # Arrange
+    pool = MagicMock()
+    conn = pool.connection.return_value.__enter__.return_value
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.__iter__.return_value = iter([(2, "user#2", 9, "nice", None), (1, "user#1", 4, "meh", None)])
+    db = BotDatabase(pool=pool)
+
+    # Act
+    rows = list(db.iter_feedback(batch_size=100))
+
+    # Assert
+    conn.cursor.assert_called_once_with(name="feedback_stream")
+    assert cur.itersize == 100
+    cur.fetchall.assert_not_called()
+    assert [row["id"] for row in rows] == [2, 1]
+    assert rows[0]["feedback_text"] == "nice"
+
+
+def test_feedback_and_conversation_pages_continue_below_last_key():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.description = [("id",), ("message",), ("bot_response",), ("timestamp",)]
+    cur.fetchall.return_value = []
+    db = BotDatabase(pool=pool)
+
+    # Act
+    db.get_feedback_page(5, before_id=40)
+    feedback_sql, feedback_params = cur.execute.call_args.args
+    db.get_conversation_page(1, 2, 5, before=("2026-10-01", 77))
+    history_sql, history_params = cur.execute.call_args.args
+
+    # Assert
+    assert "WHERE id < %s" in feedback_sql and "ORDER BY id DESC" in feedback_sql
+    assert feedback_params == (40, 5)
+    assert "(timestamp, id) < (%s, %s)" in history_sql
+    assert history_params == (1, 2, "2026-10-01", 77, 5)
+
+
+@pytest.mark.asyncio
+async def test_recent_feedback_pages_with_buttons(bot, ctx):
+    # Arrange
+    cog = CogDBMS(bot)
+    cog.db = MagicMock()
+    cog.db.get_feedback_page = AsyncMock(return_value=[
+        {"id": 3, "user_id": "user#3", "rating": 8, "feedback_text": "good", "timestamp": None},
+        {"id": 2, "user_id": "user#2", "rating": 6, "feedback_text": "okay", "timestamp": None},
+    ])
+
+    # Act
+    await cog.recent_feedback.callback(cog, ctx, 2)
+
+    # Assert
+    cog.db.get_feedback_page.assert_awaited_once_with(2, None)
+    view = ctx.send.call_args.kwargs["view"]
+    assert view.pages[0][1] == 2
+    assert not view.next_page.disabled
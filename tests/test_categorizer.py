@@ -0,0 +1,37 @@
+import json
+from cogs.categorizer import ContentCategorizer
+
+
+def test_default_rules_match_whole_words_only():
+    # Arrange
+    categorizer = ContentCategorizer()
+
+    # Act
+    categories, keywords = categorizer.categorize("However there are two Bugs in the x command")
+    no_match, _ = categorizer.categorize("somehow whatever")
+
+    # Assert
+    assert categories == ["bug-report"]
+    assert keywords == ["however", "there", "command"]
+    assert no_match == []
+
+
+def test_categories_keep_declared_order():
+    categorizer = ContentCategorizer()
+
+    categories, _ = categorizer.categorize("Feature idea: how to report an error?")
+
+    assert categories == ["support", "bug-report", "feature-request"]
+
+
+def test_custom_categories_from_file(tmp_path):
+    # Arrange
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({"music": ["song", "playlist"], "games": ["game"]}))
+
+    # Act
+    categorizer = ContentCategorizer.from_file(str(path))
+    results = categorizer.categorize_many(["new playlist", "game night with songs", "hello"])
+
+    # Assert
+    assert [categories for categories, _ in results] == [["music"], ["music", "games"], []]
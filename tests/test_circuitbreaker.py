@@ -0,0 +1,93 @@
+import time
+import pytest
+import psycopg2
+import psycopg2.errors
+from unittest.mock import MagicMock
+from cogs.botDBMS import BotDatabase
+from cogs.circuitbreaker import CircuitBreaker, DatabaseUnavailable
+
+
+def test_opens_after_threshold_and_fails_fast():
+    # Arrange
+    breaker = CircuitBreaker(probe=MagicMock(side_effect=OSError("down")), failure_threshold=2, probe_interval=60)
+
+    # Act
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+
+    # Assert
+    assert breaker.is_open
+    with pytest.raises(DatabaseUnavailable):
+        breaker.check()
+
+
+def test_success_resets_consecutive_failures():
+    # Arrange
+    breaker = CircuitBreaker(probe=MagicMock(), failure_threshold=2, probe_interval=60)
+
+    # Act
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    # Assert
+    assert not breaker.is_open
+
+
+def test_background_probe_closes_circuit():
+    # Arrange
+    probe = MagicMock(side_effect=[OSError("still down"), None])
+    breaker = CircuitBreaker(probe=probe, failure_threshold=1, probe_interval=0.01)
+
+    # Act
+    breaker.record_failure()
+    deadline = time.monotonic() + 2
+    while breaker.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Assert
+    assert not breaker.is_open
+    assert probe.call_count == 2
+    assert breaker.stats()["trips"] == 1
+
+
+def test_database_stops_connecting_once_circuit_opens():
+    # Arrange
+    pool = MagicMock()
+    pool.connection.return_value.__enter__.side_effect = psycopg2.OperationalError("connection refused")
+    db = BotDatabase(pool=pool)
+    db.breaker.probe_interval = 60
+
+    # Act
+    for _ in range(db.breaker.failure_threshold):
+        with pytest.raises(psycopg2.OperationalError):
+            db.ping()
+    attempts = pool.connection.call_count
+
+    # Assert
+    with pytest.raises(DatabaseUnavailable):
+        db.ping()
+    assert pool.connection.call_count == attempts
+    assert db.get_average_rating() is None
+
+
+def test_query_errors_do_not_trip_circuit():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.execute.side_effect = [
+        psycopg2.extensions.QueryCanceledError("statement timeout"),
+        psycopg2.errors.DeadlockDetected("deadlock detected"),
+        psycopg2.errors.LockNotAvailable("could not obtain lock"),
+        psycopg2.errors.DiskFull("could not extend file"),
+    ]
+    db = BotDatabase(pool=pool)
+
+    # Act
+    for _ in range(4):
+        with pytest.raises(psycopg2.OperationalError):
+            db.ping()
+
+    # Assert
+    assert not db.breaker.is_open
@@ -0,0 +1,78 @@
+import cogs.contextbuilder as contextbuilder
+from cogs.contextbuilder import ContextBuilder, TokenCounter, TRUNCATION_MARK
+
+
+def heuristic_counter(monkeypatch):
+    monkeypatch.setattr(contextbuilder, "tiktoken", None)
+    return TokenCounter()
+
+
+def test_build_replays_history_oldest_first(monkeypatch):
+    # Arrange
+    builder = ContextBuilder(budget=1000, counter=heuristic_counter(monkeypatch))
+    turns = [("second", "reply two"), ("first", "reply one")]
+
+    # Act
+    messages, report = builder.build(turns, "now")
+
+    # Assert
+    assert [m["content"] for m in messages] == ["first", "reply one", "second", "reply two", "now"]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant", "user"]
+    assert report.turns_included == 2
+    assert report.turns_dropped == 0
+    assert report.tokens <= report.budget
+
+
+def test_build_truncates_long_turns(monkeypatch):
+    # Arrange
+    builder = ContextBuilder(budget=1000, max_turn_tokens=10, counter=heuristic_counter(monkeypatch))
+    turns = [("q", "word " * 100)]
+
+    # Act
+    messages, report = builder.build(turns, "now")
+
+    # Assert
+    assert messages[1]["content"].endswith(TRUNCATION_MARK)
+    assert builder.counter.count(messages[1]["content"]) <= 10
+    assert report.turns_truncated == 1
+
+
+def test_build_drops_older_turns_beyond_the_budget(monkeypatch):
+    # Arrange
+    builder = ContextBuilder(budget=200, max_turn_tokens=100, min_turn_tokens=20,
+                             counter=heuristic_counter(monkeypatch))
+    turns = [("x" * 800, "y" * 800) for _ in range(5)]
+
+    # Act
+    messages, report = builder.build(turns, "now")
+
+    # Assert
+    assert report.tokens <= 200
+    assert report.turns_included == 1
+    assert report.turns_dropped == 4
+    assert len(messages) == 3
+
+
+def test_heuristic_counter_rounds_up(monkeypatch):
+    # Arrange
+    counter = heuristic_counter(monkeypatch)
+
+    # Act / Assert
+    assert counter.count("") == 0
+    assert counter.count("abcd") == 1
+    assert counter.count("abcde") == 2
+    assert counter.truncate("short", 10) == "short"
+
+
+def test_build_puts_the_summary_first_within_its_limit(monkeypatch):
+    # Arrange
+    builder = ContextBuilder(budget=1000, max_summary_tokens=10, counter=heuristic_counter(monkeypatch))
+
+    # Act
+    messages, report = builder.build([("q", "a")], "now", summary="likes python " * 20)
+
+    # Assert
+    assert messages[0]["role"] == "system"
+    assert messages[0]["content"].endswith(TRUNCATION_MARK)
+    assert [m["content"] for m in messages[1:]] == ["q", "a", "now"]
+    assert 0 < report.summary_tokens <= report.tokens
@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import MagicMock
+from cogs.dbmetrics import LatencyHistogram, QueryMetrics, note_pool_wait, note_rows
+from cogs.botDBMS import AsyncBotDatabase, BotDatabase
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    # Arrange
+    histogram = LatencyHistogram()
+    for _ in range(98):
+        histogram.record(0.0009)
+    histogram.record(0.052)
+    histogram.record(0.3)
+
+    # Act / Assert
+    assert histogram.percentile(50) == pytest.approx(0.0001 * 2 ** (13 / 4))  # 0.95 ms
+    assert histogram.percentile(99) == pytest.approx(0.0001 * 2 ** (37 / 4))  # 60.9 ms
+    assert histogram.percentile(100) == pytest.approx(0.0001 * 2 ** (47 / 4))  # 344 ms
+
+
+def test_timed_records_rows_pool_wait_and_errors():
+    # Arrange
+    metrics = QueryMetrics()
+
+    def query():
+        note_pool_wait(0.01)
+        note_rows(3)
+        return "ok"
+
+    def failing():
+        raise RuntimeError("boom")
+
+    def handled():
+        metrics.note_error()
+        return None
+
+    # Act
+    metrics.timed("query", query)()
+    with pytest.raises(RuntimeError):
+        metrics.timed("failing", failing)()
+    metrics.timed("handled", handled)()
+
+    # Assert
+    stats = {row["method"]: row for row in metrics.snapshot()}
+    assert stats["query"]["calls"] == 1 and stats["query"]["rows"] == 3
+    assert stats["query"]["avg_pool_wait"] == pytest.approx(0.01)
+    assert stats["query"]["errors"] == 0
+    assert stats["failing"]["errors"] == 1
+    assert stats["handled"]["errors"] == 1
+
+
+def test_nested_calls_count_once():
+    # Arrange
+    metrics = QueryMetrics()
+    inner = metrics.timed("inner", lambda: note_rows(2))
+    outer = metrics.timed("outer", lambda: inner())
+
+    # Act
+    outer()
+
+    # Assert
+    assert [row["method"] for row in metrics.snapshot()] == ["outer"]
+    assert metrics.snapshot()[0]["rows"] == 2
+
+
+@pytest.mark.asyncio
+async def test_async_database_records_every_method():
+    # Arrange
+    pool = MagicMock()
+    pool.maxconn = 2
+    db = BotDatabase(pool=pool)
+    async_db = AsyncBotDatabase(db)
+
+    # Act
+    await async_db.get_recent_conversations(1, 2)
+    await async_db.get_average_rating()
+
+    # Assert
+    methods = {row["method"] for row in db.metrics.snapshot()}
+    assert methods == {"get_recent_conversations", "get_average_rating"}
+    async_db._executor.shutdown()
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from cogs.historycache import ConversationCache, TURN_OVERHEAD_BYTES
+from cogs.botDBMS import BotDatabase
+
+
+def test_miss_then_hit_after_load():
+    # Arrange
+    cache = ConversationCache(turns_per_key=3)
+
+    # Act
+    first = cache.get(1, 2, 2)
+    cache.load(1, 2, [("m3", "r3"), ("m2", "r2"), ("m1", "r1")])
+    second = cache.get(1, 2, 2)
+
+    # Assert
+    assert first is None
+    assert second == [("m3", "r3"), ("m2", "r2")]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_append_is_write_through_and_bounded():
+    # Arrange
+    cache = ConversationCache(turns_per_key=2)
+    cache.load(1, 2, [("m1", "r1")])
+
+    # Act
+    cache.append(1, 2, "m2", "r2")
+    cache.append(1, 2, "m3", "r3")
+    cache.append(5, 6, "ignored", "not cached")
+
+    # Assert
+    assert cache.get(1, 2, 2) == [("m3", "r3"), ("m2", "r2")]
+    assert cache.get(5, 6, 1) is None
+    assert cache.stats()["bytes"] == 2 * (4 + TURN_OVERHEAD_BYTES)
+
+
+def test_least_recently_used_key_is_evicted():
+    # Arrange
+    turn_size = 4 + TURN_OVERHEAD_BYTES
+    cache = ConversationCache(turns_per_key=5, max_bytes=2 * turn_size)
+    cache.load(1, 1, [("a1", "b1")])
+    cache.load(2, 2, [("a2", "b2")])
+    cache.get(1, 1, 1)
+
+    # Act
+    cache.load(3, 3, [("a3", "b3")])
+
+    # Assert
+    assert cache.get(2, 2, 1) is None
+    assert cache.get(1, 1, 1) == [("a1", "b1")]
+    assert cache.evictions == 1
+
+
+def test_invalidate_forces_reload():
+    cache = ConversationCache()
+    cache.load(1, 2, [("m", "r")])
+
+    cache.invalidate(1, 2)
+
+    assert cache.get(1, 2, 1) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_database_serves_repeat_reads_from_cache():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    now = datetime.now()
+    cur.fetchall.return_value = [("m2", "r2", now), ("m1", "r1", now - timedelta(minutes=1))]
+    db = BotDatabase(pool=pool)
+
+    # Act
+    first = db.get_recent_conversations(1, 2)
+    second = db.get_recent_conversations(1, 2)
+
+    # Assert
+    assert first == second == [("m2", "r2"), ("m1", "r1")]
+    assert cur.execute.call_count == 1
+
+
+def test_lookback_applies_to_cached_turns():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    now = datetime.now()
+    cur.fetchall.return_value = [("new", "r2", now), ("old", "r1", now - timedelta(days=40))]
+    db = BotDatabase(pool=pool)
+    db.history_cache.load(1, 2, cur.fetchall.return_value)
+
+    # Act
+    unbounded = db.get_recent_conversations(1, 2)
+    db.history_lookback = timedelta(days=30)
+    bounded = db.get_recent_conversations(1, 2)
+
+    # Assert
+    assert unbounded == [("new", "r2"), ("old", "r1")]
+    assert bounded == [("new", "r2")]
+    cur.execute.assert_not_called()
+
+
+def test_get_serves_a_longer_read_when_the_ring_reaches_the_bound():
+    # Arrange
+    cache = ConversationCache(turns_per_key=3)
+    start = datetime(2024, 1, 1)
+    cache.load(1, 2, [(f"m{i}", f"r{i}", start + timedelta(minutes=i)) for i in range(4, 1, -1)])
+
+    # Act
+    reaching = cache.get(1, 2, 10, after=start + timedelta(minutes=2))
+    beyond = cache.get(1, 2, 10, after=start + timedelta(minutes=1))
+    unbounded = cache.get(1, 2, 10)
+
+    # Assert
+    assert reaching == [("m4", "r4"), ("m3", "r3")]
+    assert beyond is None
+    assert unbounded is None
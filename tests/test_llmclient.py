@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cogs.llmclient import LLMClient, LLMAuthenticationError, LLMError, LLMRateLimitError
+
+
+def completion(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+@pytest_asyncio.fixture
+async def stand_in():
+    """Local OpenAI-compatible server whose responses each test scripts"""
+    state = {"responses": [], "requests": [], "peers": set(), "in_flight": 0, "max_in_flight": 0, "delay": 0}
+
+    async def chat_completions(request):
+        state["requests"].append(await request.json())
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["delay"])
+            status, body, headers = state["responses"].pop(0) if state["responses"] else (200, completion("hi"), {})
+            return web.json_response(body, status=status, headers=headers)
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    server = TestServer(app)
+    await server.start_server()
+    state["base_url"] = str(server.make_url("/v1"))
+    yield state
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_reuses_pooled_connections(stand_in):
+    # Arrange
+    client = LLMClient("key", base_url=stand_in["base_url"], model="test-model", max_concurrency=1)
+
+    # Act
+    replies = [await client.chat([{"role": "user", "content": "hello"}], temperature=1) for _ in range(3)]
+    await client.close()
+
+    # Assert
+    assert replies == ["hi", "hi", "hi"]
+    assert stand_in["requests"][0] == {"model": "test-model", "messages": [{"role": "user", "content": "hello"}],
+                                       "temperature": 1}
+    assert len(stand_in["peers"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_rate_limits_and_server_errors(stand_in):
+    # Arrange
+    stand_in["responses"] = [
+        (429, {"error": "slow down"}, {"Retry-After": "0"}),
+        (503, {"error": "busy"}, {}),
+        (200, completion("  finally  "), {}),
+    ]
+    client = LLMClient("key", base_url=stand_in["base_url"], backoff=0)
+
+    # Act
+    reply = await client.chat([])
+    await client.close()
+
+    # Assert
+    assert reply == "finally"
+    assert len(stand_in["requests"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(stand_in):
+    # Arrange
+    stand_in["responses"] = [(429, {}, {"Retry-After": "0"})] * 3
+    client = LLMClient("key", base_url=stand_in["base_url"], max_retries=2, backoff=0)
+
+    # Act / Assert
+    with pytest.raises(LLMRateLimitError):
+        await client.chat([])
+    await client.close()
+    assert len(stand_in["requests"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_authentication_errors_are_not_retried(stand_in):
+    # Arrange
+    stand_in["responses"] = [(401, {"error": "bad key"}, {})]
+    client = LLMClient("wrong", base_url=stand_in["base_url"], backoff=0)
+
+    # Act / Assert
+    with pytest.raises(LLMAuthenticationError):
+        await client.chat([])
+    await client.close()
+    assert len(stand_in["requests"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped(stand_in):
+    # Arrange
+    stand_in["delay"] = 0.02
+    client = LLMClient("key", base_url=stand_in["base_url"], max_concurrency=2)
+
+    # Act
+    await asyncio.gather(*(client.chat([]) for _ in range(6)))
+    await client.close()
+
+    # Assert
+    assert stand_in["max_in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_timeouts_surface_as_llm_error(stand_in):
+    # Arrange
+    stand_in["delay"] = 0.5
+    client = LLMClient("key", base_url=stand_in["base_url"], timeout=0.05, max_retries=1, backoff=0)
+
+    # Act / Assert
+    with pytest.raises(LLMError):
+        await client.chat([])
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_pieces_as_they_arrive():
+    # Arrange
+    async def chat_completions(request):
+        assert (await request.json())["stream"] is True
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n')
+        for piece in ("Hel", "lo", "!"):
+            await response.write(f'data: {{"choices": [{{"delta": {{"content": "{piece}"}}}}]}}\n\n'.encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    server = TestServer(app)
+    await server.start_server()
+    client = LLMClient("key", base_url=str(server.make_url("/v1")))
+
+    # Act
+    pieces = [piece async for piece in client.chat_stream([{"role": "user", "content": "hi"}])]
+    await client.close()
+    await server.close()
+
+    # Assert
+    assert pieces == ["Hel", "lo", "!"]
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_piece(stand_in):
+    # Arrange
+    stand_in["responses"] = [(503, {"error": "busy"}, {})]
+    client = LLMClient("key", base_url=stand_in["base_url"], backoff=0)
+
+    # Act
+    pieces = [piece async for piece in client.chat_stream([])]
+    await client.close()
+
+    # Assert
+    assert len(stand_in["requests"]) == 2
+    assert pieces == []
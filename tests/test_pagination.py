@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+import discord
+from cogs.pagination import KeysetPaginator
+
+
+def make_interaction(user_id):
+    interaction = MagicMock(spec=discord.Interaction)
+    interaction.user = MagicMock(id=user_id)
+    interaction.response.edit_message = AsyncMock()
+    interaction.response.send_message = AsyncMock()
+    return interaction
+
+
+@pytest.mark.asyncio
+async def test_pages_are_fetched_on_demand_from_the_previous_cursor(ctx):
+    # Arrange
+    pages = {None: ([1, 2], 2), 2: ([3], None)}
+    fetch_page = AsyncMock(side_effect=lambda cursor: pages[cursor])
+    render = MagicMock(side_effect=lambda items, page: discord.Embed(title=f"{page}: {items}"))
+    paginator = KeysetPaginator(42, fetch_page, render)
+    await paginator.start(ctx)
+    interaction = make_interaction(42)
+
+    # Act
+    await paginator.next_page.callback(interaction)
+    await paginator.previous_page.callback(interaction)
+    await paginator.next_page.callback(interaction)
+
+    # Assert
+    assert [c.args[0] for c in fetch_page.call_args_list] == [None, 2]
+    titles = [c.kwargs['embed'].title for c in interaction.response.edit_message.call_args_list]
+    assert titles == ["2: [3]", "1: [1, 2]", "2: [3]"]
+    assert paginator.next_page.disabled
+
+
+@pytest.mark.asyncio
+async def test_empty_first_page_sends_nothing(ctx):
+    paginator = KeysetPaginator(42, AsyncMock(return_value=([], None)), MagicMock())
+
+    assert await paginator.start(ctx) is False
+    ctx.send.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_other_users_cannot_page(ctx):
+    paginator = KeysetPaginator(42, AsyncMock(), MagicMock())
+    interaction = make_interaction(7)
+
+    assert await paginator.interaction_check(interaction) is False
+    interaction.response.send_message.assert_awaited_once()
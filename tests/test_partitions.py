@@ -0,0 +1,76 @@
+from datetime import date
+from unittest.mock import MagicMock
+from cogs.botDBMS import BotDatabase
+from cogs.partitions import add_months, drop_partitions_before, ensure_partitions, partition_month, partition_name
+
+
+def test_month_arithmetic_crosses_years():
+    # Act / Assert
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2026, 3, 1)) == "gpt_conversation_history_p202603"
+    assert partition_month("gpt_conversation_history_p202603") == date(2026, 3, 1)
+    assert partition_month("gpt_conversation_history_unpartitioned") is None
+
+
+def test_ensure_partitions_creates_only_missing_months():
+    # Arrange
+    cur = MagicMock()
+    cur.fetchall.return_value = [("gpt_conversation_history_p202610",)]
+
+    # Act
+    created = ensure_partitions(cur, date(2026, 10, 18), 3)
+
+    # Assert
+    assert created == ["gpt_conversation_history_p202611", "gpt_conversation_history_p202612"]
+    assert cur.execute.call_args.args[1] == (date(2026, 12, 1), date(2027, 1, 1))
+
+
+def test_drop_partitions_before_keeps_months_inside_retention():
+    # Arrange
+    cur = MagicMock()
+    cur.fetchall.return_value = [
+        ("gpt_conversation_history_p202603",),
+        ("gpt_conversation_history_p202604",),
+        ("gpt_conversation_history_p202605",),
+    ]
+
+    # Act
+    dropped = drop_partitions_before(cur, date(2026, 5, 1))
+
+    # Assert
+    assert dropped == ["gpt_conversation_history_p202603", "gpt_conversation_history_p202604"]
+
+
+def test_maintenance_prunes_by_retention_and_clears_cache():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("gpt_conversation_history_p202601",), ("gpt_conversation_history_p202610",)]
+    db = BotDatabase(pool=pool)
+    db.retention_months = 6
+    db.history_cache.load(1, 2, [("hi", "hello")])
+
+    # Act
+    result = db.maintain_conversation_partitions(today=date(2026, 10, 18))
+
+    # Assert
+    assert result["dropped"] == ["gpt_conversation_history_p202601"]
+    assert "gpt_conversation_history_p202612" in result["created"]
+    assert any("DELETE FROM conversation_context" in call.args[0] for call in cur.execute.call_args_list)
+    assert db.history_cache.get(1, 2, 1) is None
+
+
+def test_maintenance_without_retention_never_drops():
+    # Arrange
+    pool = MagicMock()
+    cur = pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("gpt_conversation_history_p200001",)]
+    db = BotDatabase(pool=pool)
+    db.retention_months = 0
+
+    # Act
+    result = db.maintain_conversation_partitions(today=date(2026, 10, 18))
+
+    # Assert
+    assert result["dropped"] == []
@@ -0,0 +1,180 @@
+import os
+import pytest
+import psycopg2
+from datetime import date
+from cogs.migrations import run_migrations
+from cogs.partitions import ensure_partitions
+
+# Runs against a disposable local Postgres, e.g.
+# TEST_POSTGRES_DSN="dbname=encourage_test user=postgres host=localhost"
+# Everything happens inside one transaction that is rolled back afterwards.
+TEST_DSN = os.getenv("TEST_POSTGRES_DSN")
+
+pytestmark = pytest.mark.skipif(not TEST_DSN, reason="TEST_POSTGRES_DSN is not set")
+
+
+@pytest.fixture
+def cur():
+    try:
+        conn = psycopg2.connect(TEST_DSN)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres not reachable: {e}")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE SCHEMA plan_test")
+            cur.execute("SET LOCAL search_path TO plan_test")
+            run_migrations(conn)
+            ensure_partitions(cur, date(2024, 1, 1), 2)
+            cur.execute("""
+                INSERT INTO gpt_conversation_history (user_id, channel_id, message, bot_response, timestamp)
+                SELECT g % 500, g % 7, 'message ' || g, 'response ' || g,
+                       TIMESTAMP '2024-01-01' + g * INTERVAL '1 minute'
+                FROM generate_series(1, 20000) g
+            """)
+            cur.execute("""
+                INSERT INTO user_activities (user_id, command, timestamp)
+                SELECT g % 500, 'cmd' || (g % 20), TIMESTAMP '2024-01-01' + g * INTERVAL '1 minute'
+                FROM generate_series(1, 20000) g
+            """)
+            cur.execute("""
+                INSERT INTO conversation_memory (user_id, slot, context, timestamp)
+                SELECT u, slot, 'context ' || u || '-' || slot, TIMESTAMP '2024-01-01' + slot * INTERVAL '1 minute'
+                FROM generate_series(1, 2000) u, generate_series(0, 9) slot
+            """)
+            cur.execute("""
+                INSERT INTO smart_reminders (user_id, reminder_text, scheduled_for, context)
+                SELECT g % 500, 'reminder ' || g, TIMESTAMP '2024-01-01' + g * INTERVAL '1 minute', 'today'
+                FROM generate_series(1, 20000) g
+            """)
+            cur.execute("""
+                INSERT INTO user_points (user_id, activity_points, helpful_reactions, streak_days)
+                SELECT g, g % 1000, g % 97, g % 30
+                FROM generate_series(1, 20000) g
+            """)
+            cur.execute("""
+                INSERT INTO content_categories (content, categories, keywords, guild_id, user_id)
+                SELECT 'ticket ' || g || ' about ' || (ARRAY['login', 'music', 'ranking', 'reminder'])[g % 4 + 1],
+                       '{"categories": []}', ARRAY[]::TEXT[], g % 50, g % 500
+                FROM generate_series(1, 20000) g
+            """)
+            cur.execute("ANALYZE")
+            yield cur
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def plan_nodes(cur, query, params):
+    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    nodes = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+def index_names(nodes):
+    return {node.get("Index Name") for node in nodes if "Index Name" in node}
+
+
+def test_recent_conversations_use_index_without_sort(cur):
+    nodes = plan_nodes(cur, """
+        SELECT message, bot_response
+        FROM gpt_conversation_history
+        WHERE user_id = %s AND channel_id = %s AND timestamp >= %s
+        ORDER BY timestamp DESC
+        LIMIT %s
+    """, (42, 0, "2024-01-10", 5))
+
+    # Only the populated partition is checked; the planner may scan empty future months
+    assert any(name.startswith("gpt_conversation_history_p202401") for name in index_names(nodes))
+    assert not any(node["Node Type"] == "Seq Scan" and node.get("Relation Name", "").endswith("p202401")
+                   for node in nodes)
+
+
+def test_unbounded_recent_conversations_read_partitions_in_order(cur):
+    # The default CONVERSATION_LOOKBACK_DAYS=0 sends no timestamp bound
+    nodes = plan_nodes(cur, """
+        SELECT message, bot_response, timestamp
+        FROM gpt_conversation_history
+        WHERE user_id = %s AND channel_id = %s
+        ORDER BY timestamp DESC
+        LIMIT %s
+    """, (42, 0, 20))
+
+    node_types = {node["Node Type"] for node in nodes}
+    # Partitions do not overlap, so newest-first output is a plain Append of per-partition index scans
+    assert "Append" in node_types
+    assert not node_types & {"Sort", "Incremental Sort", "Seq Scan"}
+    assert any(name.startswith("gpt_conversation_history_p202401") for name in index_names(nodes))
+
+
+def test_recent_conversations_skip_older_partitions(cur):
+    nodes = plan_nodes(cur, """
+        SELECT message, bot_response
+        FROM gpt_conversation_history
+        WHERE user_id = %s AND channel_id = %s AND timestamp >= %s
+        ORDER BY timestamp DESC
+        LIMIT %s
+    """, (42, 0, "2024-02-01", 5))
+
+    relations = {node.get("Relation Name") for node in nodes} - {None}
+    assert relations and all(not name.endswith("p202401") for name in relations)
+
+
+def test_user_activities_lookup_uses_index(cur):
+    nodes = plan_nodes(cur, """
+        SELECT command, COUNT(*) FROM user_activities WHERE user_id = %s GROUP BY command
+    """, (42,))
+
+    assert "idx_user_activities_user_ts" in index_names(nodes)
+    assert not any(node["Node Type"] == "Seq Scan" for node in nodes)
+
+
+def test_conversation_memory_lookup_reads_one_users_ring(cur):
+    nodes = plan_nodes(cur, """
+        SELECT context FROM conversation_memory
+        WHERE user_id = %s
+        ORDER BY timestamp DESC
+        LIMIT %s
+    """, (42, 10))
+
+    assert "context_memory_ring_pkey" in index_names(nodes)
+    assert not any(node["Node Type"] == "Seq Scan" for node in nodes)
+
+
+def test_smart_reminders_lookup_uses_index(cur):
+    nodes = plan_nodes(cur, """
+        SELECT id FROM smart_reminders WHERE user_id = %s ORDER BY scheduled_for
+    """, (42,))
+
+    assert "idx_smart_reminders_user_scheduled" in index_names(nodes)
+    assert not any(node["Node Type"] in ("Seq Scan", "Sort") for node in nodes)
+
+
+def test_rankings_page_reads_score_index_without_sort(cur):
+    nodes = plan_nodes(cur, """
+        SELECT user_id, activity_points, helpful_reactions, streak_days, total_score
+        FROM user_points
+        WHERE total_score <= %s AND (total_score < %s OR user_id > %s)
+        ORDER BY total_score DESC, user_id
+        LIMIT %s
+    """, (500.0, 500.0, 42, 10))
+
+    assert "idx_user_points_score" in index_names(nodes)
+    assert not any(node["Node Type"] in ("Seq Scan", "Sort") for node in nodes)
+
+
+def test_content_search_uses_gin_index(cur):
+    nodes = plan_nodes(cur, """
+        SELECT id, ts_rank(search_vector, q) AS rank
+        FROM content_categories, websearch_to_tsquery('english', %s) q
+        WHERE search_vector @@ q AND guild_id = %s
+    """, ("ticket 4242", 42))
+
+    assert index_names(nodes) & {"idx_content_categories_search", "idx_content_categories_owner"}
+    assert not any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "content_categories"
+                   for node in nodes)
@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from datetime import datetime, timedelta
+import discord
+from cogs.reminders import ReminderScheduler
+
+
+@pytest.fixture
+def scheduler(bot):
+    with patch('cogs.reminders.get_async_database') as get_db:
+        db = get_db.return_value
+        db.get_pending_reminders = AsyncMock(return_value=[])
+        db.mark_reminders = AsyncMock()
+        yield ReminderScheduler(bot)
+
+
+@pytest.mark.asyncio
+async def test_delivers_due_reminders_in_order_and_marks_in_one_batch(scheduler, bot):
+    # Arrange
+    now = datetime(2024, 1, 1, 12, 0)
+    scheduler.db.get_pending_reminders.return_value = [
+        (2, 20, "second", now - timedelta(minutes=1)),
+        (1, 10, "first", now - timedelta(minutes=5)),
+        (3, 30, "later", now + timedelta(minutes=10)),
+    ]
+    user = MagicMock(spec=discord.User)
+    user.send = AsyncMock()
+    bot.get_user.return_value = user
+    await scheduler.load_window(now)
+
+    # Act
+    delivered = await scheduler.deliver_due(now)
+
+    # Assert
+    assert delivered == 2
+    assert [c.kwargs['embed'].description for c in user.send.call_args_list] == ["first", "second"]
+    scheduler.db.mark_reminders.assert_awaited_once_with([1, 2], 'sent')
+    assert scheduler._heap[0][1] == 3
+
+
+@pytest.mark.asyncio
+async def test_reload_only_reads_the_next_slice(scheduler):
+    # Arrange
+    now = datetime(2024, 1, 1, 12, 0)
+    await scheduler.load_window(now)
+
+    # Act
+    await scheduler.load_window(now + scheduler.horizon)
+
+    # Assert
+    first, second = scheduler.db.get_pending_reminders.call_args_list
+    assert first.args == (None, now + scheduler.horizon)
+    assert second.args == (now + scheduler.horizon, now + 2 * scheduler.horizon)
+
+
+@pytest.mark.asyncio
+async def test_new_reminder_inside_loaded_window_is_queued_once(scheduler):
+    # Arrange
+    now = datetime(2024, 1, 1, 12, 0)
+    await scheduler.load_window(now)
+    reminder = {"reminder_id": 7, "user_id": 1, "text": "soon", "scheduled_for": now + timedelta(minutes=5)}
+    far = {"reminder_id": 8, "user_id": 1, "text": "later", "scheduled_for": now + timedelta(days=1)}
+
+    # Act
+    await scheduler.on_reminder_created(reminder)
+    await scheduler.on_reminder_created(reminder)
+    await scheduler.on_reminder_created(far)
+
+    # Assert
+    assert [entry[1] for entry in scheduler._heap] == [7]
+    assert scheduler._wakeup.is_set()
+
+
+@pytest.mark.asyncio
+async def test_failed_mark_is_retried_before_new_deliveries(scheduler, bot):
+    # Arrange
+    now = datetime(2024, 1, 1, 12, 0)
+    user = MagicMock(spec=discord.User)
+    user.send = AsyncMock()
+    bot.get_user.return_value = user
+    scheduler.db.mark_reminders.side_effect = [Exception("circuit open"), None, None]
+    await scheduler.load_window(now)
+    scheduler.schedule(1, 10, "first", now - timedelta(minutes=1))
+    with pytest.raises(Exception):
+        await scheduler.deliver_due(now)
+    scheduler.schedule(2, 10, "second", now + timedelta(minutes=1))
+
+    # Act
+    delivered = await scheduler.deliver_due(now + timedelta(minutes=1))
+
+    # Assert
+    assert delivered == 1
+    assert user.send.await_count == 2
+    assert [c.args for c in scheduler.db.mark_reminders.await_args_list] == [
+        ([1], 'sent'), ([1], 'sent'), ([2], 'sent')
+    ]
+    assert scheduler._unmarked == {'sent': [], 'failed': []}
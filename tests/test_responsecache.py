@@ -0,0 +1,88 @@
+from cogs.responsecache import ResponseCache, normalize_prompt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_prompt_ignores_mentions_case_and_punctuation():
+    # Act / Assert
+    assert normalize_prompt("<@123> Hi!") == "hi"
+    assert normalize_prompt("  <@!123>   What is   Python?? ") == "what is python"
+    assert normalize_prompt("<@123>") == ""
+
+
+def test_hit_requires_same_prompt_and_context():
+    # Arrange
+    cache = ResponseCache()
+    context = [{"role": "user", "content": "earlier"}]
+    cache.put(cache.key("<@1> hi", context, model="m"), "hello!")
+
+    # Act
+    hit = cache.get(cache.key("HI.", context, model="m"))
+    other_context = cache.get(cache.key("hi", [], model="m"))
+    other_params = cache.get(cache.key("hi", context, model="other"))
+
+    # Assert
+    assert hit == "hello!"
+    assert other_context is None and other_params is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hit_rate"] == 1 / 3
+
+
+def test_entries_expire_after_ttl():
+    # Arrange
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, clock=clock)
+    key = cache.key("hi", [])
+    cache.put(key, "hello")
+
+    # Act
+    clock.now = 59
+    fresh = cache.get(key)
+    clock.now = 60
+    expired = cache.get(key)
+
+    # Assert
+    assert fresh == "hello"
+    assert expired is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    # Arrange
+    cache = ResponseCache(max_entries=2)
+    a, b, c = (cache.key(prompt, []) for prompt in ("a", "b", "c"))
+    cache.put(a, "A")
+    cache.put(b, "B")
+    cache.get(a)
+
+    # Act
+    cache.put(c, "C")
+
+    # Assert
+    assert cache.get(b) is None
+    assert cache.get(a) == "A" and cache.get(c) == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_guild_opt_out_and_disabled_cache():
+    # Arrange
+    cache = ResponseCache()
+    cache.load_opt_outs([5])
+
+    # Act
+    cache.set_enabled(6, False)
+    cache.set_enabled(5, True)
+
+    # Assert
+    assert cache.enabled_for(5)
+    assert not cache.enabled_for(6)
+    assert cache.enabled_for(None)
+    assert not ResponseCache(max_entries=0).enabled_for(5)
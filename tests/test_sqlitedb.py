@@ -0,0 +1,245 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from cogs.botDBMS import AsyncBotDatabase, create_database
+from cogs.sqlitedb import SQLITE_LATEST_VERSION, SQLiteBotDatabase, fts_query, to_sqlite_placeholders
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = SQLiteBotDatabase(str(tmp_path / "bot.db"))
+    db.migrate()
+    yield db
+    db.close()
+
+
+def test_placeholders_and_search_terms_are_translated():
+    # Act / Assert
+    assert to_sqlite_placeholders("SELECT %s %% %s") == "SELECT ? % ?"
+    assert fts_query("python's decorators?") == '"python" "s" "decorators"'
+    assert fts_query("!!") is None
+
+
+def test_backend_is_chosen_from_environment(tmp_path):
+    # Arrange
+    env = {"DATABASE_BACKEND": "sqlite", "SQLITE_PATH": str(tmp_path / "env.db")}
+
+    # Act
+    with patch.dict("os.environ", env):
+        db = create_database()
+
+    # Assert
+    assert isinstance(db, SQLiteBotDatabase)
+    assert db.pool.path == env["SQLITE_PATH"]
+
+
+def test_migrate_is_idempotent_and_uses_wal(db):
+    # Act
+    version = db.migrate()
+
+    # Assert
+    assert version == SQLITE_LATEST_VERSION
+    with db.get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_conversations_round_trip(db):
+    # Arrange
+    now = datetime.now()
+    db.store_conversations([
+        (1, 2, "how do decorators work", "they wrap functions", ["earlier"], now - timedelta(seconds=1)),
+        (1, 2, "thanks", "any time", ["earlier", "how do decorators work"], now),
+    ])
+
+    # Act
+    recent = db.get_recent_conversations(1, 2)
+    first_page = db.get_conversation_page(1, 2, 1)
+    second_page = db.get_conversation_page(1, 2, 1, (first_page[0]["timestamp"], first_page[0]["id"]))
+    context = db.get_context_used(first_page[0]["id"])
+    found = db.search_conversations(1, 2, "decorator")
+
+    # Assert
+    assert recent == [("thanks", "any time"), ("how do decorators work", "they wrap functions")]
+    assert isinstance(first_page[0]["timestamp"], datetime)
+    assert second_page[0]["message"] == "how do decorators work"
+    assert context == ["earlier", "how do decorators work"]
+    assert [result["message"] for result in found] == ["how do decorators work"]
+
+
+def test_turns_to_summarize_skip_the_newest_and_the_covered(db):
+    # Arrange
+    start = datetime.now() - timedelta(hours=1)
+    db.store_conversations([
+        (1, 2, f"question {i}", f"answer {i}", [], start + timedelta(minutes=i)) for i in range(8)
+    ])
+
+    # Act
+    first = db.get_turns_to_summarize(1, 2, keep=3, limit=2)
+    saved = db.save_conversation_summary(1, 2, "asked questions 0 and 1", 2, first[-1]["timestamp"], first[-1]["id"])
+    summary = db.get_conversation_summary(1, 2)
+    rest = db.get_turns_to_summarize(1, 2, keep=3, limit=10, after=(summary["covered_until"], summary["covered_id"]))
+    stale = db.save_conversation_summary(1, 2, "stale", 5, rest[-1]["timestamp"], rest[-1]["id"], previous_id=None)
+    db.clear_user_history(1, 2)
+    after_clear = db.save_conversation_summary(1, 2, "cleared", 5, rest[-1]["timestamp"], rest[-1]["id"],
+                                               previous_id=summary["covered_id"])
+
+    # Assert
+    assert [turn["message"] for turn in first] == ["question 0", "question 1"]
+    assert summary["summary"] == "asked questions 0 and 1"
+    assert summary["turns_covered"] == 2
+    assert [turn["message"] for turn in rest] == ["question 2", "question 3", "question 4"]
+    assert saved is True
+    assert stale is False and after_clear is False
+    assert db.get_conversation_summary(1, 2) is None
+
+
+def test_response_cache_opt_outs_round_trip(db):
+    # Act
+    db.set_response_cache_opt_out(10, True)
+    db.set_response_cache_opt_out(10, True)
+    db.set_response_cache_opt_out(20, True)
+    db.set_response_cache_opt_out(20, False)
+
+    # Assert
+    assert db.get_response_cache_opt_outs() == [10]
+
+
+def test_clear_history_also_clears_search_index(db):
+    # Arrange
+    db.store_conversations([(1, 2, "secret plans", "noted", [], datetime.now())])
+
+    # Act
+    db.clear_user_history(1, 2)
+
+    # Assert
+    assert db.get_conversation_page(1, 2, 5) == []
+    assert db.search_conversations(1, 2, "secret") == []
+
+
+def test_search_stays_in_the_channel(db):
+    # Arrange
+    now = datetime.now()
+    db.store_conversations([
+        (1, 2, "my dm secret", "kept private", [], now),
+        (1, 3, "guild question about secret sauce", "ketchup", [], now),
+    ])
+
+    # Act
+    guild_results = db.search_conversations(1, 3, "secret")
+    dm_results = db.search_conversations(1, 2, "secret")
+
+    # Assert
+    assert [result["message"] for result in guild_results] == ["guild question about secret sauce"]
+    assert [result["message"] for result in dm_results] == ["my dm secret"]
+
+
+def test_retention_drops_contexts_only_expired_turns_used(db):
+    # Arrange
+    db.retention_months = 1
+    db.store_conversations([
+        (1, 2, "old question", "old answer", ["old context", "shared context"], datetime(2026, 1, 5)),
+        (1, 2, "new question", "new answer", ["shared context"], datetime(2026, 10, 5)),
+    ])
+
+    # Act
+    result = db.maintain_conversation_partitions(today=date(2026, 10, 18))
+
+    # Assert
+    assert result["deleted_rows"] == 1
+    with db.get_connection() as conn:
+        contexts = [row[0] for row in conn.execute("SELECT content FROM conversation_context")]
+    assert contexts == ["shared context"]
+
+
+def test_activity_reminders_and_context_memory(db):
+    # Arrange
+    now = datetime.now()
+    db.record_activities([(1, "help", now), (1, "help", now), (1, None, now)])
+
+    # Act
+    patterns = db.track_user_activity_patterns(1)
+    reminder = db.implement_smart_reminders(1, "stretch", "urgent")
+    due = db.get_pending_reminders(None, now + timedelta(days=2))
+    db.mark_reminders([reminder["reminder_id"]], "sent")
+    memories = [db.implement_context_memory(1, text, max_memory=2) for text in ("a", "b", "c")]
+
+    # Assert
+    assert patterns["popular_commands"] == [{"command": "help", "count": 2}]
+    assert patterns["peak_hours"][0]["count"] == 3
+    assert due == [(reminder["reminder_id"], 1, "stretch", reminder["scheduled_for"])]
+    assert db.get_pending_reminders(None, now + timedelta(days=2)) == []
+    assert memories[-1] == ["c", "b"]
+
+
+def test_rankings_page_by_keyset_across_ties(db):
+    # Arrange
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO user_points (user_id, activity_points) VALUES (?, ?)",
+            [(1, 10), (2, 5), (3, 5), (4, 5), (5, 1)]
+        )
+
+    # Act
+    pages, after = [], None
+    while True:
+        page = db.create_dynamic_user_rankings(2, after)
+        if not page:
+            break
+        pages.append([(rank["rank"], rank["user_id"]) for rank in page])
+        after = (page[-1]["total_score"], page[-1]["user_id"], page[-1]["rank"])
+
+    # Assert
+    assert pages == [[(1, 1), (2, 2)], [(3, 3), (4, 4)], [(5, 5)]]
+
+
+def test_categorized_content_is_searchable(db):
+    # Act
+    stored = db.categorize_contents(["I hit a bug on login", "music feature idea"], guild_id=10, user_id=1)
+    db.categorize_contents(["login bug in my dms"], guild_id=None, user_id=2)
+    found = db.search_categorized_content("login bugs", 10, 3)
+    other_guild = db.search_categorized_content("login bugs", 20, 1)
+    own_dms = db.search_categorized_content("login", None, 2)
+    other_dms = db.search_categorized_content("login", None, 1)
+
+    # Assert
+    assert [item["content_id"] for item in stored] == [1, 2]
+    assert [result["id"] for result in found] == [1]
+    assert found[0]["categories"] == {"categories": ["bug-report"]}
+    assert other_guild == []
+    assert [result["content"] for result in own_dms] == ["login bug in my dms"]
+    assert other_dms == []
+
+
+def test_feedback_aggregate_and_paging(db):
+    # Arrange
+    for rating in (8, 6, 10):
+        assert db.save_feedback("user#1", rating, "text")
+
+    # Act
+    distribution = db.get_rating_distribution()
+    page = db.get_feedback_page(2)
+    rest = db.get_feedback_page(2, before_id=page[-1]["id"])
+
+    # Assert
+    assert db.get_average_rating() == 8.0
+    assert distribution["histogram"][10] == 1 and distribution["count"] == 3
+    assert [row["rating"] for row in page + rest] == [10, 6, 8]
+    assert [row["id"] for row in db.iter_feedback(batch_size=1)] == [3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_from_executor_threads(db):
+    # Arrange
+    async_db = AsyncBotDatabase(db, max_workers=4)
+    now = datetime.now()
+
+    # Act
+    await asyncio.gather(*(
+        async_db.store_conversations([(user_id, 1, "hi", "hello", [], now)]) for user_id in range(20)
+    ))
+
+    # Assert
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM gpt_conversation_history").fetchone()[0] == 20
+    async_db._executor.shutdown()
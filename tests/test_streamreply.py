@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from cogs.streamreply import StreamingReply, split_message
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def channel():
+    channel = MagicMock()
+    sent = []
+
+    async def send(content):
+        message = MagicMock()
+        message.content = content
+        message.edit = AsyncMock(side_effect=lambda content: setattr(message, "content", content))
+        sent.append(message)
+        return message
+
+    channel.send = AsyncMock(side_effect=send)
+    channel.sent = sent
+    return channel
+
+
+def test_split_message_prefers_line_then_word_breaks():
+    # Arrange
+    text = "a" * 15 + "\n" + "b" * 10 + " " + "c" * 10
+
+    # Act
+    parts = split_message(text, limit=20)
+
+    # Assert
+    assert parts == ["a" * 15, "b" * 10, "c" * 10]
+    assert split_message("x" * 45, limit=20) == ["x" * 20, "x" * 20, "x" * 5]
+
+
+@pytest.mark.asyncio
+async def test_first_piece_is_posted_immediately_and_edits_are_throttled(channel):
+    # Arrange
+    clock = FakeClock()
+    reply = StreamingReply(channel, edit_interval=1.0, clock=clock)
+
+    # Act
+    await reply.append("Hello")
+    first_content = channel.sent[0].content
+    await reply.append(" there")
+    clock.now = 1.5
+    await reply.append(", friend")
+    await reply.append("!")
+    text = await reply.finish()
+
+    # Assert
+    assert first_content == "Hello"
+    assert len(channel.sent) == 1
+    assert channel.sent[0].edit.await_count == 2
+    assert channel.sent[0].content == text == "Hello there, friend!"
+
+
+@pytest.mark.asyncio
+async def test_long_replies_continue_in_new_messages(channel):
+    # Arrange
+    reply = StreamingReply(channel, edit_interval=0, limit=20)
+
+    # Act
+    for word in ["word"] * 12:
+        await reply.append(word + " ")
+    await reply.finish()
+
+    # Assert
+    contents = [message.content for message in channel.sent]
+    assert all(len(content) <= 20 for content in contents)
+    assert " ".join(contents).split() == ["word"] * 12
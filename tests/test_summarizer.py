@@ -0,0 +1,175 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+from cogs.botDBMS import AsyncBotDatabase
+from cogs.sqlitedb import SQLiteBotDatabase
+from cogs.summarizer import ConversationCompactor
+
+
+@pytest.fixture
+def db(tmp_path):
+    sync_db = SQLiteBotDatabase(str(tmp_path / "bot.db"))
+    sync_db.migrate()
+    db = AsyncBotDatabase(sync_db, max_workers=2)
+    yield db
+    db.close()
+
+
+def store_turns(db, count, start=None):
+    start = start or datetime.now() - timedelta(hours=1)
+    db.db.store_conversations([
+        (1, 2, f"question {i}", f"answer {i}", [], start + timedelta(minutes=i)) for i in range(count)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_compact_folds_everything_but_the_newest_turns(db):
+    # Arrange
+    store_turns(db, 12)
+    llm = AsyncMock()
+    llm.chat.side_effect = ["first summary", "second summary"]
+    compactor = ConversationCompactor(db, llm, keep_turns=4, batch_limit=5)
+
+    # Act
+    folded = await compactor.compact(1, 2)
+    summary = await db.get_conversation_summary(1, 2)
+
+    # Assert
+    assert folded == 8
+    assert llm.chat.await_count == 2
+    second_prompt = llm.chat.await_args_list[1].args[0][1]["content"]
+    assert "first summary" in second_prompt
+    assert "question 5" in second_prompt and "question 8" not in second_prompt
+    assert summary["summary"] == "second summary"
+    assert summary["turns_covered"] == 8
+    assert compactor.stats()["turns_folded"] == 8
+
+
+@pytest.mark.asyncio
+async def test_compact_skips_short_histories(db):
+    # Arrange
+    store_turns(db, 3)
+    llm = AsyncMock()
+    compactor = ConversationCompactor(db, llm, keep_turns=4)
+
+    # Act
+    folded = await compactor.compact(1, 2)
+
+    # Assert
+    assert folded == 0
+    llm.chat.assert_not_awaited()
+    assert await db.get_conversation_summary(1, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_keeps_the_old_one(db):
+    # Arrange
+    store_turns(db, 6)
+    llm = AsyncMock()
+    llm.chat.side_effect = RuntimeError("boom")
+    compactor = ConversationCompactor(db, llm, keep_turns=2)
+
+    # Act
+    folded = await compactor.compact(1, 2)
+
+    # Assert
+    assert folded == 0
+    assert compactor.failures == 1
+    assert await db.get_conversation_summary(1, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_note_turn_compacts_in_the_background_every_n_turns(db):
+    # Arrange
+    store_turns(db, 6)
+    llm = AsyncMock()
+    llm.chat.return_value = "summary"
+    compactor = ConversationCompactor(db, llm, keep_turns=2, compact_every=3)
+
+    # Act
+    compactor.note_turn(1, 2)
+    compactor.note_turn(1, 2)
+    started_early = bool(compactor._running)
+    compactor.note_turn(1, 2)
+    await compactor.close()
+
+    # Assert
+    assert not started_early
+    assert llm.chat.await_count == 1
+    assert (await db.get_conversation_summary(1, 2))["turns_covered"] == 4
+
+
+@pytest.mark.asyncio
+async def test_forget_cancels_a_running_compaction(db):
+    # Arrange
+    store_turns(db, 6)
+    started = asyncio.Event()
+
+    async def slow_chat(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(10)
+        return "summary of a cleared conversation"
+
+    llm = AsyncMock()
+    llm.chat.side_effect = slow_chat
+    compactor = ConversationCompactor(db, llm, keep_turns=2, compact_every=1)
+    compactor.note_turn(1, 2)
+    await started.wait()
+
+    # Act
+    await compactor.forget(1, 2)
+    await db.clear_user_history(1, 2)
+
+    # Assert
+    assert not compactor._running
+    assert await db.get_conversation_summary(1, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_load_context_keeps_turns_between_compactions(db):
+    # Arrange
+    start = datetime.now() - timedelta(hours=1)
+    store_turns(db, 20, start)
+    llm = AsyncMock()
+    llm.chat.return_value = "summary of the first ten"
+    compactor = ConversationCompactor(db, llm, keep_turns=10, compact_every=10)
+    await compactor.compact(1, 2)
+    db.db.store_conversations([
+        (1, 2, f"question {i}", f"answer {i}", [], start + timedelta(minutes=i)) for i in range(20, 29)
+    ])
+
+    # Act
+    turns, summary = await compactor.load_context(1, 2, recent_turns=10)
+
+    # Assert
+    assert summary == "summary of the first ten"
+    assert [message for message, _ in turns] == [f"question {i}" for i in range(28, 9, -1)]
+
+
+@pytest.mark.asyncio
+async def test_load_context_without_summary_reads_the_newest_turns(db):
+    # Arrange
+    store_turns(db, 12)
+    compactor = ConversationCompactor(db, AsyncMock(), keep_turns=10)
+
+    # Act
+    turns, summary = await compactor.load_context(1, 2, recent_turns=5)
+
+    # Assert
+    assert summary is None
+    assert [message for message, _ in turns] == [f"question {i}" for i in range(11, 6, -1)]
+
+
+@pytest.mark.asyncio
+async def test_note_turn_drops_the_oldest_pending_counts(db):
+    # Arrange
+    compactor = ConversationCompactor(db, AsyncMock(), compact_every=10, max_pending=2)
+
+    # Act
+    for channel_id in (1, 2, 3):
+        compactor.note_turn(1, channel_id)
+
+    # Assert
+    assert list(compactor._pending) == [(1, 2), (1, 3)]
+    assert compactor.stats()["pending"] == 2
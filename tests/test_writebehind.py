@@ -0,0 +1,172 @@
+import pytest
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
+from cogs.writebehind import ConversationWriter
+
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    db.store_conversations = AsyncMock()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full(db):
+    # Arrange
+    writer = ConversationWriter(db, batch_size=2, flush_interval=60)
+    writer.start()
+
+    # Act
+    writer.enqueue(1, 2, "hi", "hello", [])
+    writer.enqueue(1, 2, "how are you", "great", ["hi", "hello"])
+    await asyncio.sleep(0.01)
+
+    # Assert
+    db.store_conversations.assert_awaited_once()
+    rows = db.store_conversations.call_args.args[0]
+    assert [row[2] for row in rows] == ["hi", "how are you"]
+    assert writer.pending == 0
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_interval(db):
+    # Arrange
+    writer = ConversationWriter(db, batch_size=100, flush_interval=0.01)
+    writer.start()
+
+    # Act
+    writer.enqueue(1, 2, "hi", "hello", [])
+    await asyncio.sleep(0.05)
+
+    # Assert
+    db.store_conversations.assert_awaited_once()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_buffer(db):
+    # Arrange
+    writer = ConversationWriter(db, batch_size=100, flush_interval=60)
+    writer.start()
+    writer.enqueue(1, 2, "hi", "hello", [])
+
+    # Act
+    await writer.close()
+
+    # Assert
+    db.store_conversations.assert_awaited_once()
+    with pytest.raises(RuntimeError):
+        writer.enqueue(1, 2, "late", "reply", [])
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows(db):
+    # Arrange
+    db.store_conversations.side_effect = [Exception("db down"), None]
+    writer = ConversationWriter(db, batch_size=100, flush_interval=60)
+    writer.enqueue(1, 2, "hi", "hello", [])
+
+    # Act
+    first = await writer.flush()
+    second = await writer.flush()
+
+    # Assert
+    assert (first, second) == (0, 1)
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_spill_to_disk_and_replay(db, tmp_path):
+    # Arrange
+    spill = tmp_path / "spill.jsonl"
+    writer = ConversationWriter(db, batch_size=10, flush_interval=60, spill_path=str(spill))
+    db.store_conversations.side_effect = [OSError("database down"), None, None]
+
+    # Act
+    writer.enqueue(1, 2, "hi", "hello", ["earlier"])
+    await writer.flush()
+    spilled = spill.read_text().splitlines()
+    writer.enqueue(1, 2, "back?", "yes", [])
+    written = await writer.flush()
+
+    # Assert
+    assert len(spilled) == 1
+    assert writer.pending == 0
+    assert written == 2
+    assert not spill.exists()
+    replayed = db.store_conversations.call_args.args[0]
+    assert replayed[0][:5] == (1, 2, "hi", "hello", ["earlier"])
+
+
+@pytest.mark.asyncio
+async def test_spill_replays_without_new_turns(db, tmp_path):
+    # Arrange
+    spill = tmp_path / "spill.jsonl"
+    writer = ConversationWriter(db, batch_size=10, flush_interval=60, spill_path=str(spill))
+    db.store_conversations.side_effect = [OSError("database down"), OSError("still down"), None]
+    writer.enqueue(1, 2, "hi", "hello", [])
+    await writer.flush()
+
+    # Act
+    while_down = await writer.flush()
+    spilled = spill.read_text()
+    await writer.close()
+
+    # Assert
+    assert while_down == 0 and '"hi"' in spilled
+    assert db.store_conversations.await_count == 3
+    assert not spill.exists()
+
+
+@pytest.mark.asyncio
+async def test_replay_keeps_rows_that_still_fail(db, tmp_path):
+    # Arrange
+    spill = tmp_path / "spill.jsonl"
+    writer = ConversationWriter(db, batch_size=1, flush_interval=60, spill_path=str(spill))
+    db.store_conversations.side_effect = [OSError("down"), OSError("down"), None, None, OSError("down again")]
+    writer.enqueue(1, 2, "one", "1", [])
+    await writer.flush()
+    writer.enqueue(1, 2, "two", "2", [])
+    await writer.flush()
+
+    # Act
+    writer.enqueue(1, 2, "three", "3", [])
+    await writer.flush()
+
+    # Assert
+    remaining = spill.read_text().splitlines()
+    assert len(remaining) == 1 and '"two"' in remaining[0]
+
+
+@pytest.mark.asyncio
+async def test_discard_waits_for_in_flight_flush_and_drops_failed_rows(db):
+    # Arrange
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_failure(rows):
+        started.set()
+        await release.wait()
+        raise Exception("db down")
+
+    db.store_conversations.side_effect = slow_failure
+    writer = ConversationWriter(db, batch_size=100, flush_interval=60)
+    writer.enqueue(1, 2, "cleared", "gone", [])
+    writer.enqueue(3, 4, "other", "kept", [])
+    flush = asyncio.create_task(writer.flush())
+    await started.wait()
+
+    # Act
+    discard = asyncio.create_task(writer.discard(1, 2))
+    await asyncio.sleep(0.01)
+    waited = not discard.done()
+    writer.enqueue(1, 2, "after clear", "kept", [])
+    release.set()
+    await asyncio.gather(flush, discard)
+
+    # Assert
+    assert waited
+    assert writer.pending == 2
+    assert [row[2] for row in writer._buffer] == ["other", "after clear"]